@@ -6,14 +6,14 @@ from resources.vec_db import VecDB
 from models import Mention, MentionList, AgentCodedConcept, FullCodedConcept, EnhancedConcept, ConceptRelation, ConceptCollection, ExtractionLogger
 from models.model_config import DEFAULT_MODEL
 import json
-import dotenv
 import pprint
 from agents.strings import examples
 from typing import Optional, Tuple
 import uuid
 import time
 
-dotenv.load_dotenv(override=True)
+# Load environment variables (secure in production, local in development)
+import load_env_secure
 
 # Initialize database instances
 sql_db = SqlDB()
@@ -41,7 +41,12 @@ def extract_and_code_mentions(text: str, status_widget=None) -> Tuple[list[FullC
     
     _log_mention_identification(extraction_logger, step_id, text, mentions, usage)
     
-    mentions_str = set([mention.mention_str for mention in mentions])
+    # One coding run per mention regardless of case; the annotator highlights every
+    # occurrence case-insensitively, so the first spelling seen stands in for the rest
+    unique_mentions: dict[str, str] = {}
+    for mention in mentions:
+        unique_mentions.setdefault(mention.mention_str.casefold(), mention.mention_str)
+    mentions_str = list(unique_mentions.values())
     
     _log_deduplication(extraction_logger, len(mentions), mentions_str)
 
@@ -58,14 +63,17 @@ def extract_and_code_mentions(text: str, status_widget=None) -> Tuple[list[FullC
     return coded_concepts, extraction_logger
 
 
-def get_concept_ids_context(concept_ids: list[str]) -> ConceptCollection:
+def get_concept_ids_context(concept_ids: list[int]) -> ConceptCollection:
     """Get context for a list of concept IDs, including hierarchy information."""
     # Get mappings to standard concepts
-    sql_query = f"SELECT concept_id_1, concept_id_2 FROM concept_relationship WHERE concept_id_1 IN ({','.join(concept_ids)}) AND relationship_id = 'Maps to'"
-    mapping_results = sql_db.run_query(sql_query)
+    sql_query = "SELECT concept_id_1, concept_id_2 FROM concept_relationship WHERE concept_id_1 = ANY(?::BIGINT[]) AND relationship_id = 'Maps to'"
+    mapping_results = sql_db.run_query_arrow(sql_query, [concept_ids])
     
     # Create a mapping dict: original_id -> standard_id
-    concept_mappings = {str(row[0]): str(row[1]) for row in mapping_results}
+    concept_mappings = dict(zip(
+        mapping_results.column("concept_id_1").to_pylist(),
+        mapping_results.column("concept_id_2").to_pylist()
+    ))
     
     # For each original concept, use the standard mapping if available, otherwise use the original
     final_concept_ids = []
@@ -79,26 +87,31 @@ def get_concept_ids_context(concept_ids: list[str]) -> ConceptCollection:
     final_concept_ids = list(dict.fromkeys(final_concept_ids))
     
     # Get concept details
-    sql_query = f"SELECT concept_id, concept_name, domain_id, vocabulary_id, concept_code, standard_concept FROM concept WHERE concept_id IN ({','.join(final_concept_ids)})"
-    hits_details = sql_db.run_query(sql_query)
+    sql_query = "SELECT concept_id, concept_name, domain_id, vocabulary_id, concept_code, standard_concept FROM concept WHERE concept_id = ANY(?::BIGINT[])"
+    hits_details = sql_db.run_query(sql_query, [final_concept_ids])
+    hit_ids = [row[0] for row in hits_details]
+    
+    # Get parent concepts (concepts that each hit "Is a" type of) for all hits in one query
+    sql_query = "SELECT concept_relationship.concept_id_1, concept_relationship.concept_id_2, concept.concept_name FROM concept_relationship INNER JOIN concept ON concept_relationship.concept_id_2 = concept.concept_id WHERE concept_id_1 = ANY(?::BIGINT[]) AND relationship_id = 'Is a'"
+    parents_by_id: dict[int, list[ConceptRelation]] = {}
+    for concept_id, parent_id, parent_name in sql_db.run_query(sql_query, [hit_ids]):
+        parents_by_id.setdefault(concept_id, []).append(ConceptRelation(concept_id=parent_id, concept_name=str(parent_name)))
+    
+    # Get child concepts (concepts that are "Is a" type of each hit), likewise batched
+    sql_query = "SELECT concept_relationship.concept_id_2, concept_relationship.concept_id_1, concept.concept_name FROM concept_relationship INNER JOIN concept ON concept_relationship.concept_id_1 = concept.concept_id WHERE concept_id_2 = ANY(?::BIGINT[]) AND relationship_id = 'Is a'"
+    children_by_id: dict[int, list[ConceptRelation]] = {}
+    for concept_id, child_id, child_name in sql_db.run_query(sql_query, [hit_ids]):
+        children_by_id.setdefault(concept_id, []).append(ConceptRelation(concept_id=child_id, concept_name=str(child_name)))
     
     # Build enhanced concepts with hierarchy information
     enhanced_concepts = []
     for row in hits_details:
         concept_id, concept_name, domain_id, vocabulary_id, concept_code, standard_concept = row
-        
-        # Get parent concepts (concepts that this concept "Is a" type of)
-        sql_query = f"SELECT concept_relationship.concept_id_2, concept.concept_name FROM concept_relationship INNER JOIN concept ON concept_relationship.concept_id_2 = concept.concept_id WHERE concept_id_1 = {concept_id} AND relationship_id = 'Is a'"
-        parents_data = sql_db.run_query(sql_query)
-        parent_concepts = [ConceptRelation(concept_id=str(parent[0]), concept_name=str(parent[1])) for parent in parents_data] if parents_data else None
-        
-        # Get child concepts (concepts that are "Is a" type of this concept)
-        sql_query = f"SELECT concept_relationship.concept_id_1, concept.concept_name FROM concept_relationship INNER JOIN concept ON concept_relationship.concept_id_1 = concept.concept_id WHERE concept_id_2 = {concept_id} AND relationship_id = 'Is a'"
-        children_data = sql_db.run_query(sql_query)
-        child_concepts = [ConceptRelation(concept_id=str(child[0]), concept_name=str(child[1])) for child in children_data] if children_data else None
+        parent_concepts = parents_by_id.get(concept_id)
+        child_concepts = children_by_id.get(concept_id)
         
         enhanced_concept = EnhancedConcept(
-            concept_id=str(concept_id),
+            concept_id=concept_id,
             concept_name=str(concept_name),
             domain_id=str(domain_id),
             vocabulary_id=str(vocabulary_id),
@@ -221,7 +234,7 @@ EXAMPLES AND GUIDELINES: {examples}"""
         return search_results.to_yaml()
 
     @sub_agent.tool
-    async def get_concept_context(ctx: RunContext, concept_ids: list[str]) -> str:
+    async def get_concept_context(ctx: RunContext, concept_ids: list[int]) -> str:
         """Retrieve hierarchical context about concept IDs.
         
         Useful to identify potential more-general or more-specific concepts by exploring 
@@ -251,8 +264,8 @@ EXAMPLES AND GUIDELINES: {examples}"""
     original_concept_id = run_result.concept_id
     step_id = extraction_logger.start_step("mapping", "concept_mapping", "Checking for standard concept mapping")
     
-    sql_query = f"SELECT concept_id_2 FROM concept_relationship WHERE concept_id_1 = {original_concept_id} AND relationship_id = 'Maps to'"
-    query_result = sql_db.run_query(sql_query)
+    sql_query = "SELECT concept_id_2 FROM concept_relationship WHERE concept_id_1 = ? AND relationship_id = 'Maps to'"
+    query_result = sql_db.run_query(sql_query, [original_concept_id])
     
     if query_result:
         agent_picked_concept_id = query_result[0][0]
@@ -269,13 +282,13 @@ EXAMPLES AND GUIDELINES: {examples}"""
 
     step_id = extraction_logger.start_step("final_retrieval", "final_concept_retrieval", "Retrieving final concept details")
     
-    sql_query = f"SELECT concept_id, concept_name, domain_id, vocabulary_id, concept_code, standard_concept FROM concept WHERE concept_id = {agent_picked_concept_id}"
-    query_result = sql_db.run_query(sql_query)
+    sql_query = "SELECT concept_id, concept_name, domain_id, vocabulary_id, concept_code, standard_concept FROM concept WHERE concept_id = ?"
+    query_result = sql_db.run_query(sql_query, [agent_picked_concept_id])
     concept_data = query_result[0]
      
     coded_concept = FullCodedConcept(
          mention_str=found_mention,
-         concept_id=str(concept_data[0]),
+         concept_id=concept_data[0],
          concept_name=str(concept_data[1]),
          domain_id=str(concept_data[2]),
          vocabulary_id=str(concept_data[3]),
@@ -399,7 +412,7 @@ def _log_agent_reasoning(extraction_logger: ExtractionLogger, step_id: str, conc
     )
 
 
-def _log_concept_mapping(extraction_logger: ExtractionLogger, step_id: str, original_concept_id: str, final_concept_id: str, mapping_found: bool) -> None:
+def _log_concept_mapping(extraction_logger: ExtractionLogger, step_id: str, original_concept_id: int, final_concept_id: int, mapping_found: bool) -> None:
     """Log standard concept mapping results."""
     extraction_logger.log_step(
         step_type="concept_mapping",
@@ -413,7 +426,7 @@ def _log_concept_mapping(extraction_logger: ExtractionLogger, step_id: str, orig
     )
 
 
-def _log_final_concept_retrieval(extraction_logger: ExtractionLogger, step_id: str, concept_id: str, coded_concept) -> None:
+def _log_final_concept_retrieval(extraction_logger: ExtractionLogger, step_id: str, concept_id: int, coded_concept) -> None:
     """Log final concept retrieval and details."""
     extraction_logger.log_step(
         step_type="final_concept_retrieval",
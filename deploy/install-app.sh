@@ -31,6 +31,11 @@ echo "Copying application files..."
 cp -r . /opt/snobot/
 rm -f /opt/snobot/.env  # Remove any .env from the copy
 
+# Persisted resolver results were pickled by the previous version of the code
+# (snobot's home is /opt/snobot, so this is its ~/.streamlit/cache)
+echo "Clearing persisted resolver cache..."
+rm -rf /opt/snobot/.streamlit/cache
+
 # Move .env to secure location
 echo "Setting up secure configuration..."
 cp .env /etc/snobot/.env
@@ -18,7 +18,7 @@ sys.path.insert(0, str(project_root))
 
 from agents.extract_agent import extract_and_code_mentions
 from models.model_config import get_model_config, DEFAULT_MODEL
-from utils.report_generator import generate_markdown_report, generate_summary_stats
+from utils.report_generator import generate_summary_stats, write_markdown_report
 # Import database classes directly to avoid Streamlit warnings
 from resources.sql_db import SqlDB
 from resources.vec_db import VecDB
@@ -206,8 +206,8 @@ class SNOMEDEvaluator:
         """
         try:
             # Query the concept table to get the SNOMED code
-            sql_query = f"SELECT concept_code, vocabulary_id FROM concept WHERE concept_id = {omop_concept_id}"
-            query_result = self.sql_db.run_query(sql_query)
+            sql_query = "SELECT concept_code, vocabulary_id FROM concept WHERE concept_id = ?"
+            query_result = self.sql_db.run_query(sql_query, [omop_concept_id])
             
             if query_result and len(query_result) > 0:
                 concept_code, vocabulary_id = query_result[0]
@@ -280,9 +280,8 @@ class SNOMEDEvaluator:
             
             # Save markdown report
             markdown_path = self.reports_dir / f"{base_filename}.md"
-            markdown_report = generate_markdown_report(log)
             with open(markdown_path, 'w', encoding='utf-8') as f:
-                f.write(markdown_report)
+                write_markdown_report(log, f)
             
             # Log cost information
             usage_stats = log.get_usage_statistics()
@@ -619,9 +618,7 @@ class SNOMEDEvaluator:
             self.span_analyzer.generate_enhanced_summary(analysis_results, str(enhanced_summary_path))
             
             # Create visualizations for each note
-            note_ids = set()
-            for span in agent_spans + gold_spans:
-                note_ids.add(span.note_id)
+            note_ids = np.unique(np.concatenate([agent_spans.note_ids, gold_spans.note_ids])).tolist()
             
             visualizations_dir = output_dir / "span_visualizations"
             visualizations_dir.mkdir(exist_ok=True)
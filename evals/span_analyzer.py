@@ -7,14 +7,16 @@ well and where it needs improvement.
 """
 
 import pandas as pd
+import numpy as np
 import json
+import io
 from pathlib import Path
-from typing import List, Dict, Any, Tuple, Optional, Set
-from dataclasses import dataclass, asdict
+from typing import List, Dict, Any, Tuple, Optional, Set, Iterable
+from dataclasses import dataclass, field
 from enum import Enum
 import logging
-from collections import defaultdict
 import re
+from concurrent.futures import ProcessPoolExecutor
 
 
 class OverlapType(Enum):
@@ -25,7 +27,7 @@ class OverlapType(Enum):
     NO_OVERLAP = "no_overlap"            # No overlap between spans
 
 
-@dataclass
+@dataclass(slots=True)
 class SpanInfo:
     """Information about a single span"""
     note_id: str
@@ -35,14 +37,28 @@ class SpanInfo:
     concept_id: int
     concept_name: str = ""
     source: str = ""  # "agent" or "gold"
+    _length: int = field(init=False, repr=False, compare=False)
     
     def __post_init__(self):
         # Ensure concept_id is int
         self.concept_id = int(self.concept_id)
+        self._length = self.end - self.start
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary for JSON serialization"""
+        return {
+            "note_id": self.note_id,
+            "start": self.start,
+            "end": self.end,
+            "text": self.text,
+            "concept_id": self.concept_id,
+            "concept_name": self.concept_name,
+            "source": self.source
+        }
     
     @property
     def length(self) -> int:
-        return self.end - self.start
+        return self._length
     
     def overlaps_with(self, other: 'SpanInfo') -> bool:
         """Check if this span overlaps with another span"""
@@ -56,13 +72,68 @@ class SpanInfo:
     
     def iou_with(self, other: 'SpanInfo') -> float:
         """Calculate IoU (Intersection over Union) with another span"""
-        intersection = self.overlap_length(other)
-        if intersection == 0:
+        intersection = min(self.end, other.end) - max(self.start, other.start)
+        if intersection <= 0:
             return 0.0
-        union = self.length + other.length - intersection
+        union = self._length + other._length - intersection
         return intersection / union if union > 0 else 0.0
 
 
+@dataclass
+class SpanTable:
+    """Columnar (struct-of-arrays) storage for a set of spans from one source
+
+    Numeric columns are NumPy arrays so overlap computations and grouping run on
+    contiguous buffers; `SpanInfo` objects are only materialized on demand.
+    """
+    note_ids: np.ndarray      # object dtype, str note ids
+    starts: np.ndarray        # int64
+    ends: np.ndarray          # int64
+    concept_ids: np.ndarray   # int64
+    texts: List[str]
+    concept_names: List[str]
+    source: str = ""  # "agent" or "gold"
+    
+    def __len__(self) -> int:
+        return len(self.starts)
+    
+    def span(self, i: int) -> SpanInfo:
+        """Materialize the span at row `i` as a SpanInfo"""
+        return SpanInfo(
+            note_id=self.note_ids[i],
+            start=int(self.starts[i]),
+            end=int(self.ends[i]),
+            text=self.texts[i],
+            concept_id=int(self.concept_ids[i]),
+            concept_name=self.concept_names[i],
+            source=self.source
+        )
+    
+    def take(self, idx: np.ndarray) -> 'SpanTable':
+        """Return a new table holding the rows at `idx`, in that order"""
+        return SpanTable(
+            note_ids=self.note_ids[idx],
+            starts=self.starts[idx],
+            ends=self.ends[idx],
+            concept_ids=self.concept_ids[idx],
+            texts=[self.texts[i] for i in idx.tolist()],
+            concept_names=[self.concept_names[i] for i in idx.tolist()],
+            source=self.source
+        )
+    
+    def group_by_note(self) -> Tuple['SpanTable', Dict[str, slice]]:
+        """Sort rows by note_id (stable) and map each note_id to its contiguous row slice"""
+        if len(self) == 0:
+            return self, {}
+        table = self.take(np.argsort(self.note_ids, kind="stable"))
+        unique_notes, first = np.unique(table.note_ids, return_index=True)
+        bounds = np.append(first[1:], len(table))
+        return table, {
+            note_id: slice(lo, hi)
+            for note_id, lo, hi in zip(unique_notes.tolist(), first.tolist(), bounds.tolist())
+        }
+
+
 @dataclass
 class SpanComparison:
     """Detailed comparison between agent and gold standard spans"""
@@ -71,13 +142,31 @@ class SpanComparison:
     overlap_type: OverlapType
     iou_score: float
     overlap_length: int
-    notes: List[str]
+    
+    @property
+    def notes(self) -> List[str]:
+        """Descriptive notes about the comparison, generated on demand"""
+        agent_span, gold_span = self.agent_span, self.gold_span
+        
+        if self.overlap_type == OverlapType.EXACT_MATCH:
+            return ["Perfect match: same span boundaries and concept"]
+        elif self.overlap_type == OverlapType.CONCEPT_MISMATCH:
+            return [f"Span boundaries match but concept differs: agent={agent_span.concept_name} vs gold={gold_span.concept_name}"]
+        elif self.overlap_type == OverlapType.PARTIAL_OVERLAP:
+            notes = [f"Partial overlap: agent=({agent_span.start}-{agent_span.end}) vs gold=({gold_span.start}-{gold_span.end})"]
+            if agent_span.text != gold_span.text:
+                notes.append(f"Text differs: agent='{agent_span.text}' vs gold='{gold_span.text}'")
+            return notes
+        elif gold_span is None:
+            return ["Agent predicted this span but no corresponding gold standard span found"]
+        else:
+            return ["Gold standard span that agent failed to predict"]
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary for JSON serialization"""
         return {
-            "agent_span": asdict(self.agent_span) if self.agent_span else None,
-            "gold_span": asdict(self.gold_span) if self.gold_span else None,
+            "agent_span": self.agent_span.to_dict() if self.agent_span else None,
+            "gold_span": self.gold_span.to_dict() if self.gold_span else None,
             "overlap_type": self.overlap_type.value,
             "iou_score": round(self.iou_score, 4),
             "overlap_length": self.overlap_length,
@@ -85,6 +174,73 @@ class SpanComparison:
         }
 
 
+# Overlap type of a matched agent/gold pair, indexed by the codes computed in _analyze_note_spans
+_MATCH_OVERLAP_TYPES = (OverlapType.EXACT_MATCH, OverlapType.PARTIAL_OVERLAP, OverlapType.CONCEPT_MISMATCH)
+
+
+def _overlap_matrix(a_starts: np.ndarray, a_ends: np.ndarray,
+                    g_starts: np.ndarray, g_ends: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Pairwise overlap lengths and IoU scores (agent spans x gold spans)
+    
+    Intermediate results are computed in place, so only the two returned N x K
+    buffers plus one scratch buffer are allocated regardless of note size.
+    """
+    overlap = np.minimum.outer(a_ends, g_ends)
+    scratch = np.maximum.outer(a_starts, g_starts)
+    overlap -= scratch
+    np.maximum(overlap, 0, out=overlap)
+    # union = len(a) + len(g) - overlap, which is > 0 wherever overlap > 0
+    union = np.add.outer(a_ends - a_starts, g_ends - g_starts, out=scratch)
+    union -= overlap
+    iou = np.divide(overlap, union, out=np.zeros(overlap.shape), where=overlap > 0)
+    return overlap, iou
+
+
+def _match_spans(iou: np.ndarray, iou_threshold: float) -> Tuple[np.ndarray, np.ndarray]:
+    """Greedily match each agent span, in order, to its best still-unmatched gold span
+    
+    Returns parallel arrays of matched agent and gold row indices.
+    """
+    # Scores below the threshold can never match; matched gold columns are zeroed in place
+    scores = np.where(iou >= iou_threshold, iou, 0.0)
+    matched_agent, matched_gold = [], []
+    if scores.shape[1] > 0:
+        for i, row in enumerate(scores):
+            j = int(row.argmax())
+            if row[j] > 0:
+                matched_agent.append(i)
+                matched_gold.append(j)
+                scores[:, j] = 0.0
+    return np.array(matched_agent, dtype=np.intp), np.array(matched_gold, dtype=np.intp)
+
+
+def _dump_json(value: Any, level: int) -> str:
+    """Serialize a value with indent=2 as if nested `level` levels deep in a larger document"""
+    return json.dumps(value, indent=2, ensure_ascii=False).replace("\n", "\n" + "  " * level)
+
+
+def _write_json_object(f, items: Iterable[Tuple[str, Any]], level: int) -> None:
+    """Write (key, value) pairs as a JSON object, serializing one value at a time"""
+    indent = "  " * (level + 1)
+    opened = False
+    for key, value in items:
+        f.write(",\n" if opened else "{\n")
+        opened = True
+        f.write(f"{indent}{json.dumps(key, ensure_ascii=False)}: {_dump_json(value, level + 1)}")
+    f.write("\n" + "  " * level + "}" if opened else "{}")
+
+
+def _write_json_array(f, values: Iterable[Any], level: int) -> None:
+    """Write values as a JSON array, serializing one element at a time"""
+    indent = "  " * (level + 1)
+    opened = False
+    for value in values:
+        f.write(",\n" if opened else "[\n")
+        opened = True
+        f.write(indent + _dump_json(value, level + 1))
+    f.write("\n" + "  " * level + "]" if opened else "[]")
+
+
 class SpanAnalyzer:
     """Comprehensive span analysis for SNOMED entity linking evaluation"""
     
@@ -101,16 +257,16 @@ class SpanAnalyzer:
         if self.sql_db:
             try:
                 # Try looking up by concept_code first (for SNOMED codes)
-                query = f"SELECT concept_name FROM concept WHERE concept_code = '{concept_id}' AND vocabulary_id IN ('SNOMED', 'SNOMEDCT_US')"
-                result = self.sql_db.run_query(query)
+                query = "SELECT concept_name FROM concept WHERE concept_code = ? AND vocabulary_id IN ('SNOMED', 'SNOMEDCT_US')"
+                result = self.sql_db.run_query(query, [str(concept_id)])
                 if result and len(result) > 0:
                     name = str(result[0][0])
                     self.concept_name_cache[concept_id] = name
                     return name
                 
                 # Fallback to concept_id lookup (for OMOP concept IDs)
-                query = f"SELECT concept_name FROM concept WHERE concept_id = {concept_id}"
-                result = self.sql_db.run_query(query)
+                query = "SELECT concept_name FROM concept WHERE concept_id = ?"
+                result = self.sql_db.run_query(query, [concept_id])
                 if result and len(result) > 0:
                     name = str(result[0][0])
                     self.concept_name_cache[concept_id] = name
@@ -122,33 +278,40 @@ class SpanAnalyzer:
         self.concept_name_cache[concept_id] = f"Unknown concept {concept_id}"
         return self.concept_name_cache[concept_id]
     
-    def load_spans_from_csv(self, csv_path: str, source: str, text_data: Dict[str, str] = None) -> List[SpanInfo]:
+    def load_spans_from_csv(self, csv_path: str, source: str, text_data: Dict[str, str] = None) -> SpanTable:
         """Load spans from CSV file (either agent predictions or gold standard)"""
         df = pd.read_csv(csv_path)
-        spans = []
-        
-        for _, row in df.iterrows():
-            # Extract text from the span if text_data is provided
-            text = ""
-            if text_data and row['note_id'] in text_data:
-                full_text = text_data[row['note_id']]
-                text = full_text[row['start']:row['end']]
-            
-            # Get concept name
-            concept_name = self.get_concept_name(row['concept_id'])
-            
-            span = SpanInfo(
-                note_id=str(row['note_id']),
-                start=int(row['start']),
-                end=int(row['end']),
-                text=text,
-                concept_id=int(row['concept_id']),
-                concept_name=concept_name,
-                source=source
-            )
-            spans.append(span)
-        
-        return spans
+        # Keep each note's rows together (in file order) so per-note work happens once per note
+        df['note_id'] = df['note_id'].astype(str)
+        df = df.sort_values('note_id', kind='stable')
+        
+        note_ids = df['note_id'].to_numpy(dtype=object)
+        starts = df['start'].to_numpy(dtype=np.int64)
+        ends = df['end'].to_numpy(dtype=np.int64)
+        concept_ids = df['concept_id'].to_numpy(dtype=np.int64)
+        
+        # Extract text from the span if text_data is provided, looking up each note's text once
+        if text_data:
+            texts = []
+            for note_id, group in df.groupby('note_id', sort=False):
+                full_text = text_data.get(note_id, "")
+                texts.extend(full_text[start:end] for start, end in zip(group['start'].tolist(), group['end'].tolist()))
+        else:
+            texts = [""] * len(df)
+        
+        # Get concept names, one lookup per distinct concept
+        names = {cid: self.get_concept_name(cid) for cid in np.unique(concept_ids).tolist()}
+        concept_names = [names[cid] for cid in concept_ids.tolist()]
+        
+        return SpanTable(
+            note_ids=note_ids,
+            starts=starts,
+            ends=ends,
+            concept_ids=concept_ids,
+            texts=texts,
+            concept_names=concept_names,
+            source=source
+        )
     
     def load_text_data(self, notes_csv_path: str) -> Dict[str, str]:
         """Load text data from notes CSV file"""
@@ -158,28 +321,23 @@ class SpanAnalyzer:
             text_data[str(row['note_id'])] = str(row['text'])
         return text_data
     
-    def analyze_spans(self, agent_spans: List[SpanInfo], gold_spans: List[SpanInfo], 
+    def analyze_spans(self, agent_spans: SpanTable, gold_spans: SpanTable, 
                      iou_threshold: float = 0.5) -> Dict[str, Any]:
         """
         Comprehensive analysis of spans comparing agent predictions to gold standard
         
         Args:
-            agent_spans: List of agent-predicted spans
-            gold_spans: List of gold standard spans  
+            agent_spans: Table of agent-predicted spans
+            gold_spans: Table of gold standard spans  
             iou_threshold: Minimum IoU for considering spans as matching
             
         Returns:
             Detailed analysis results
         """
-        # Group spans by note_id
-        agent_by_note = defaultdict(list)
-        gold_by_note = defaultdict(list)
-        
-        for span in agent_spans:
-            agent_by_note[span.note_id].append(span)
-        
-        for span in gold_spans:
-            gold_by_note[span.note_id].append(span)
+        # Group spans by note_id: each note's spans become a contiguous slice of the sorted tables
+        agent_spans, agent_by_note = agent_spans.group_by_note()
+        gold_spans, gold_by_note = gold_spans.group_by_note()
+        no_spans = slice(0, 0)
         
         # Get all note_ids
         all_notes = set(agent_by_note.keys()) | set(gold_by_note.keys())
@@ -195,38 +353,19 @@ class SpanAnalyzer:
             "concept_mismatches": 0,
             "agent_only_spans": 0,
             "gold_only_spans": 0,
-            "by_concept_id": defaultdict(lambda: {
-                "agent_count": 0, "gold_count": 0, "matches": 0, "concept_name": ""
-            }),
+            "by_concept_id": {},
             "by_note_id": {}
         }
         
         for note_id in all_notes:
-            note_agent_spans = agent_by_note.get(note_id, [])
-            note_gold_spans = gold_by_note.get(note_id, [])
-            
             note_stats = self._analyze_note_spans(
-                note_agent_spans, note_gold_spans, iou_threshold
+                agent_spans, agent_by_note.get(note_id, no_spans),
+                gold_spans, gold_by_note.get(note_id, no_spans),
+                iou_threshold
             )
             
             stats["by_note_id"][note_id] = note_stats
-            # Convert comparison dicts back to objects for processing
-            note_comparisons = []
-            for comp_dict in note_stats["comparisons"]:
-                # Reconstruct SpanComparison objects from dict for further processing
-                agent_span = SpanInfo(**comp_dict["agent_span"]) if comp_dict["agent_span"] else None
-                gold_span = SpanInfo(**comp_dict["gold_span"]) if comp_dict["gold_span"] else None
-                overlap_type = OverlapType(comp_dict["overlap_type"])
-                comparison = SpanComparison(
-                    agent_span=agent_span,
-                    gold_span=gold_span,
-                    overlap_type=overlap_type,
-                    iou_score=comp_dict["iou_score"],
-                    overlap_length=comp_dict["overlap_length"],
-                    notes=comp_dict["notes"]
-                )
-                note_comparisons.append(comparison)
-            comparisons.extend(note_comparisons)
+            comparisons.extend(note_stats["comparisons"])
             
             # Aggregate stats
             stats["exact_matches"] += note_stats["exact_matches"]
@@ -236,21 +375,20 @@ class SpanAnalyzer:
             stats["gold_only_spans"] += note_stats["gold_only_spans"]
         
         # Aggregate concept-level statistics
-        for span in agent_spans:
-            stats["by_concept_id"][span.concept_id]["agent_count"] += 1
-            stats["by_concept_id"][span.concept_id]["concept_name"] = span.concept_name
-        
-        for span in gold_spans:
-            stats["by_concept_id"][span.concept_id]["gold_count"] += 1
-            stats["by_concept_id"][span.concept_id]["concept_name"] = span.concept_name
+        by_concept_id = stats["by_concept_id"]
+        for table, count_key in ((agent_spans, "agent_count"), (gold_spans, "gold_count")):
+            concept_ids, first, counts = np.unique(table.concept_ids, return_index=True, return_counts=True)
+            for concept_id, i, count in zip(concept_ids.tolist(), first.tolist(), counts.tolist()):
+                concept_stats = by_concept_id.setdefault(concept_id, {
+                    "agent_count": 0, "gold_count": 0, "matches": 0, "concept_name": ""
+                })
+                concept_stats[count_key] = count
+                concept_stats["concept_name"] = table.concept_names[i]
         
         for comparison in comparisons:
             if comparison.overlap_type == OverlapType.EXACT_MATCH:
                 concept_id = comparison.agent_span.concept_id
-                stats["by_concept_id"][concept_id]["matches"] += 1
-        
-        # Convert defaultdict to regular dict for JSON serialization
-        stats["by_concept_id"] = dict(stats["by_concept_id"])
+                by_concept_id[concept_id]["matches"] += 1
         
         return {
             "statistics": stats,
@@ -260,157 +398,121 @@ class SpanAnalyzer:
             }
         }
     
-    def _analyze_note_spans(self, agent_spans: List[SpanInfo], gold_spans: List[SpanInfo],
+    def _analyze_note_spans(self, agent_table: SpanTable, agent_rows: slice,
+                           gold_table: SpanTable, gold_rows: slice,
                            iou_threshold: float) -> Dict[str, Any]:
-        """Analyze spans for a single note"""
+        """Analyze spans for a single note, given the row slices of its spans in each (note-sorted) table"""
         comparisons = []
-        matched_agent_indices = set()
-        matched_gold_indices = set()
+        
+        a_starts = agent_table.starts[agent_rows]
+        a_ends = agent_table.ends[agent_rows]
+        a_cids = agent_table.concept_ids[agent_rows]
+        g_starts = gold_table.starts[gold_rows]
+        g_ends = gold_table.ends[gold_rows]
+        g_cids = gold_table.concept_ids[gold_rows]
+        
+        # Find best matches for each agent span
+        overlap, iou = _overlap_matrix(a_starts, a_ends, g_starts, g_ends)
+        matched_agent, matched_gold = _match_spans(iou, iou_threshold)
+        
+        # Determine overlap types for all matched pairs at once
+        exact_boundary = (a_starts[matched_agent] == g_starts[matched_gold]) & (a_ends[matched_agent] == g_ends[matched_gold])
+        concept_eq = a_cids[matched_agent] == g_cids[matched_gold]
+        is_exact = exact_boundary & concept_eq
+        is_concept_mismatch = ~concept_eq
+        is_partial = concept_eq & ~exact_boundary
+        overlap_types = np.where(is_exact, 0, np.where(is_concept_mismatch, 2, 1))
+        
+        agent_only = np.ones(len(a_starts), dtype=bool)
+        agent_only[matched_agent] = False
+        gold_only = np.ones(len(g_starts), dtype=bool)
+        gold_only[matched_gold] = False
         
         stats = {
-            "agent_span_count": len(agent_spans),
-            "gold_span_count": len(gold_spans),
-            "exact_matches": 0,
-            "partial_overlaps": 0,
-            "concept_mismatches": 0,
-            "agent_only_spans": 0,
-            "gold_only_spans": 0,
+            "agent_span_count": len(a_starts),
+            "gold_span_count": len(g_starts),
+            "exact_matches": int(is_exact.sum()),
+            "partial_overlaps": int(is_partial.sum()),
+            "concept_mismatches": int(is_concept_mismatch.sum()),
+            "agent_only_spans": int(agent_only.sum()),
+            "gold_only_spans": int(gold_only.sum()),
             "comparisons": []
         }
         
-        # Find best matches for each agent span
-        for i, agent_span in enumerate(agent_spans):
-            best_match = None
-            best_iou = 0.0
-            best_gold_idx = -1
-            
-            for j, gold_span in enumerate(gold_spans):
-                if j in matched_gold_indices:
-                    continue
-                
-                iou = agent_span.iou_with(gold_span)
-                if iou > best_iou and iou >= iou_threshold:
-                    best_iou = iou
-                    best_match = gold_span
-                    best_gold_idx = j
-            
-            if best_match:
-                # Found a match
-                matched_agent_indices.add(i)
-                matched_gold_indices.add(best_gold_idx)
-                
-                # Determine overlap type
-                if (agent_span.start == best_match.start and 
-                    agent_span.end == best_match.end and
-                    agent_span.concept_id == best_match.concept_id):
-                    overlap_type = OverlapType.EXACT_MATCH
-                    stats["exact_matches"] += 1
-                elif agent_span.concept_id != best_match.concept_id:
-                    overlap_type = OverlapType.CONCEPT_MISMATCH
-                    stats["concept_mismatches"] += 1
-                else:
-                    overlap_type = OverlapType.PARTIAL_OVERLAP
-                    stats["partial_overlaps"] += 1
-                
-                comparison = SpanComparison(
-                    agent_span=agent_span,
-                    gold_span=best_match,
-                    overlap_type=overlap_type,
-                    iou_score=best_iou,
-                    overlap_length=agent_span.overlap_length(best_match),
-                    notes=self._generate_comparison_notes(agent_span, best_match, overlap_type)
-                )
-                comparisons.append(comparison)
+        for i, j, overlap_code in zip(matched_agent.tolist(), matched_gold.tolist(), overlap_types.tolist()):
+            overlap_type = _MATCH_OVERLAP_TYPES[overlap_code]
+            agent_span = agent_table.span(agent_rows.start + i)
+            gold_span = gold_table.span(gold_rows.start + j)
+            comparison = SpanComparison(
+                agent_span=agent_span,
+                gold_span=gold_span,
+                overlap_type=overlap_type,
+                iou_score=float(iou[i, j]),
+                overlap_length=int(overlap[i, j])
+            )
+            comparisons.append(comparison)
         
         # Handle unmatched agent spans
-        for i, agent_span in enumerate(agent_spans):
-            if i not in matched_agent_indices:
-                stats["agent_only_spans"] += 1
-                comparison = SpanComparison(
-                    agent_span=agent_span,
-                    gold_span=None,
-                    overlap_type=OverlapType.NO_OVERLAP,
-                    iou_score=0.0,
-                    overlap_length=0,
-                    notes=["Agent predicted this span but no corresponding gold standard span found"]
-                )
-                comparisons.append(comparison)
+        for i in np.flatnonzero(agent_only).tolist():
+            comparison = SpanComparison(
+                agent_span=agent_table.span(agent_rows.start + i),
+                gold_span=None,
+                overlap_type=OverlapType.NO_OVERLAP,
+                iou_score=0.0,
+                overlap_length=0
+            )
+            comparisons.append(comparison)
         
         # Handle unmatched gold spans
-        for j, gold_span in enumerate(gold_spans):
-            if j not in matched_gold_indices:
-                stats["gold_only_spans"] += 1
-                comparison = SpanComparison(
-                    agent_span=None,
-                    gold_span=gold_span,
-                    overlap_type=OverlapType.NO_OVERLAP,
-                    iou_score=0.0,
-                    overlap_length=0,
-                    notes=["Gold standard span that agent failed to predict"]
-                )
-                comparisons.append(comparison)
-        
-        stats["comparisons"] = [comp.to_dict() for comp in comparisons]
-        return stats
-    
-    def _generate_comparison_notes(self, agent_span: SpanInfo, gold_span: SpanInfo, 
-                                 overlap_type: OverlapType) -> List[str]:
-        """Generate descriptive notes about the comparison"""
-        notes = []
-        
-        if overlap_type == OverlapType.EXACT_MATCH:
-            notes.append("Perfect match: same span boundaries and concept")
-        elif overlap_type == OverlapType.CONCEPT_MISMATCH:
-            notes.append(f"Span boundaries match but concept differs: agent={agent_span.concept_name} vs gold={gold_span.concept_name}")
-        elif overlap_type == OverlapType.PARTIAL_OVERLAP:
-            notes.append(f"Partial overlap: agent=({agent_span.start}-{agent_span.end}) vs gold=({gold_span.start}-{gold_span.end})")
-            if agent_span.text != gold_span.text:
-                notes.append(f"Text differs: agent='{agent_span.text}' vs gold='{gold_span.text}'")
+        for j in np.flatnonzero(gold_only).tolist():
+            comparison = SpanComparison(
+                agent_span=None,
+                gold_span=gold_table.span(gold_rows.start + j),
+                overlap_type=OverlapType.NO_OVERLAP,
+                iou_score=0.0,
+                overlap_length=0
+            )
+            comparisons.append(comparison)
         
-        return notes
+        stats["comparisons"] = comparisons
+        return stats
     
     def generate_enhanced_summary(self, analysis_results: Dict[str, Any], 
                                 output_path: str) -> str:
-        """Generate an enhanced summary report with detailed span analysis"""
+        """Generate an enhanced summary report with detailed span analysis
+        
+        The note-level and detailed comparison sections are streamed to the file one
+        entry at a time, so the serialized form of every comparison is never held in
+        memory at once.
+        """
         
         stats = analysis_results["statistics"]
         comparisons = analysis_results["comparisons"]
         
-        # Create summary structure
-        summary = {
-            "span_analysis_summary": {
-                "total_spans": {
-                    "agent_predictions": stats["total_agent_spans"],
-                    "gold_standard": stats["total_gold_spans"],
-                    "notes_processed": stats["notes_processed"]
-                },
-                "overlap_analysis": {
-                    "exact_matches": stats["exact_matches"],
-                    "partial_overlaps": stats["partial_overlaps"], 
-                    "concept_mismatches": stats["concept_mismatches"],
-                    "agent_only_spans": stats["agent_only_spans"],
-                    "gold_only_spans": stats["gold_only_spans"]
-                },
-                "performance_metrics": {
-                    "precision": stats["exact_matches"] / stats["total_agent_spans"] if stats["total_agent_spans"] > 0 else 0,
-                    "recall": stats["exact_matches"] / stats["total_gold_spans"] if stats["total_gold_spans"] > 0 else 0,
-                    "match_rate": stats["exact_matches"] / max(stats["total_agent_spans"], stats["total_gold_spans"]) if max(stats["total_agent_spans"], stats["total_gold_spans"]) > 0 else 0
-                }
+        span_analysis_summary = {
+            "total_spans": {
+                "agent_predictions": stats["total_agent_spans"],
+                "gold_standard": stats["total_gold_spans"],
+                "notes_processed": stats["notes_processed"]
+            },
+            "overlap_analysis": {
+                "exact_matches": stats["exact_matches"],
+                "partial_overlaps": stats["partial_overlaps"], 
+                "concept_mismatches": stats["concept_mismatches"],
+                "agent_only_spans": stats["agent_only_spans"],
+                "gold_only_spans": stats["gold_only_spans"]
             },
-            "concept_level_analysis": {},
-            "note_level_analysis": {},
-            "detailed_comparisons": {
-                "exact_matches": [],
-                "partial_overlaps": [],
-                "concept_mismatches": [],
-                "agent_only_spans": [],
-                "gold_only_spans": []
+            "performance_metrics": {
+                "precision": stats["exact_matches"] / stats["total_agent_spans"] if stats["total_agent_spans"] > 0 else 0,
+                "recall": stats["exact_matches"] / stats["total_gold_spans"] if stats["total_gold_spans"] > 0 else 0,
+                "match_rate": stats["exact_matches"] / max(stats["total_agent_spans"], stats["total_gold_spans"]) if max(stats["total_agent_spans"], stats["total_gold_spans"]) > 0 else 0
             }
         }
         
         # Add concept-level analysis
+        concept_level_analysis = {}
         for concept_id, concept_stats in stats["by_concept_id"].items():
-            summary["concept_level_analysis"][str(concept_id)] = {
+            concept_level_analysis[str(concept_id)] = {
                 "concept_name": concept_stats["concept_name"],
                 "agent_predictions": concept_stats["agent_count"],
                 "gold_standard_count": concept_stats["gold_count"],
@@ -419,152 +521,168 @@ class SpanAnalyzer:
                 "recall": concept_stats["matches"] / concept_stats["gold_count"] if concept_stats["gold_count"] > 0 else 0
             }
         
-        # Add note-level analysis
-        summary["note_level_analysis"] = stats["by_note_id"]
-        
-        # Organize detailed comparisons by type
+        # Organize detailed comparisons by type (references only, serialized while writing)
+        detailed_comparisons = {
+            "exact_matches": [],
+            "partial_overlaps": [],
+            "concept_mismatches": [],
+            "agent_only_spans": [],
+            "gold_only_spans": []
+        }
         for comparison in comparisons:
-            comp_dict = comparison.to_dict()
-            overlap_type = comparison.overlap_type.value
+            overlap_type = comparison.overlap_type
             
-            if overlap_type == "exact_match":
-                summary["detailed_comparisons"]["exact_matches"].append(comp_dict)
-            elif overlap_type == "partial_overlap":
-                summary["detailed_comparisons"]["partial_overlaps"].append(comp_dict)
-            elif overlap_type == "concept_mismatch":
-                summary["detailed_comparisons"]["concept_mismatches"].append(comp_dict)
-            elif overlap_type == "no_overlap":
-                if comp_dict["agent_span"] and not comp_dict["gold_span"]:
-                    summary["detailed_comparisons"]["agent_only_spans"].append(comp_dict)
-                elif comp_dict["gold_span"] and not comp_dict["agent_span"]:
-                    summary["detailed_comparisons"]["gold_only_spans"].append(comp_dict)
-        
-        # Save to file
+            if overlap_type == OverlapType.EXACT_MATCH:
+                detailed_comparisons["exact_matches"].append(comparison)
+            elif overlap_type == OverlapType.PARTIAL_OVERLAP:
+                detailed_comparisons["partial_overlaps"].append(comparison)
+            elif overlap_type == OverlapType.CONCEPT_MISMATCH:
+                detailed_comparisons["concept_mismatches"].append(comparison)
+            elif overlap_type == OverlapType.NO_OVERLAP:
+                if comparison.agent_span and not comparison.gold_span:
+                    detailed_comparisons["agent_only_spans"].append(comparison)
+                elif comparison.gold_span and not comparison.agent_span:
+                    detailed_comparisons["gold_only_spans"].append(comparison)
+        
+        # Note-level analysis, converting each note's comparisons as it is written
+        note_level_analysis = (
+            (note_id, {**note_stats, "comparisons": [comp.to_dict() for comp in note_stats["comparisons"]]})
+            for note_id, note_stats in stats["by_note_id"].items()
+        )
+        
+        # Stream to file
         with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(summary, f, indent=2, ensure_ascii=False)
+            f.write('{\n  "span_analysis_summary": ')
+            f.write(_dump_json(span_analysis_summary, 1))
+            f.write(',\n  "concept_level_analysis": ')
+            f.write(_dump_json(concept_level_analysis, 1))
+            f.write(',\n  "note_level_analysis": ')
+            _write_json_object(f, note_level_analysis, 1)
+            f.write(',\n  "detailed_comparisons": {')
+            for i, (category, group) in enumerate(detailed_comparisons.items()):
+                f.write(f'{"," if i else ""}\n    "{category}": ')
+                _write_json_array(f, (comp.to_dict() for comp in group), 2)
+            f.write('\n  }\n}')
         
         logging.info(f"Enhanced span analysis summary saved to {output_path}")
         return output_path
     
     def create_span_visualization(self, analysis_results: Dict[str, Any], 
-                                note_id: str, output_path: str, note_text: str = None) -> str:
+                                note_id: str, output_path: str, note_text: str = None) -> Optional[str]:
         """Create a markdown visualization of span overlaps for a specific note"""
         
         note_stats = analysis_results["statistics"]["by_note_id"].get(note_id)
         if not note_stats:
             raise ValueError(f"No analysis data found for note_id: {note_id}")
         
-        # Convert dict comparisons back to SpanComparison objects for visualization
-        comparisons = []
-        for comp_dict in note_stats["comparisons"]:
-            agent_span = SpanInfo(**comp_dict["agent_span"]) if comp_dict["agent_span"] else None
-            gold_span = SpanInfo(**comp_dict["gold_span"]) if comp_dict["gold_span"] else None
-            overlap_type = OverlapType(comp_dict["overlap_type"])
-            comparison = SpanComparison(
-                agent_span=agent_span,
-                gold_span=gold_span,
-                overlap_type=overlap_type,
-                iou_score=comp_dict["iou_score"],
-                overlap_length=comp_dict["overlap_length"],
-                notes=comp_dict["notes"]
-            )
-            comparisons.append(comparison)
-        
-        # Create markdown visualization
-        lines = [
-            f"# Span Analysis for Note: {note_id}",
-            "",
-            "## Summary Statistics",
-            "",
-            f"- **Agent Spans:** {note_stats['agent_span_count']}",
-            f"- **Gold Standard Spans:** {note_stats['gold_span_count']}",
-            f"- **Exact Matches:** {note_stats['exact_matches']}",
-            f"- **Partial Overlaps:** {note_stats['partial_overlaps']}",
-            f"- **Concept Mismatches:** {note_stats['concept_mismatches']}",
-            f"- **Agent Only (False Positives):** {note_stats['agent_only_spans']}",
-            f"- **Gold Only (Missed):** {note_stats['gold_only_spans']}",
-            "",
-            "## Detailed Span Comparisons",
-            ""
-        ]
-        
-        # Group comparisons by type for better organization
-        comparison_groups = {
-            "Exact Matches": [],
-            "Partial Overlaps": [],
-            "Concept Mismatches": [],
-            "Agent Only": [],
-            "Gold Only": []
-        }
-        
-        for comp in comparisons:
-            if comp.overlap_type == OverlapType.EXACT_MATCH:
-                comparison_groups["Exact Matches"].append(comp)
-            elif comp.overlap_type == OverlapType.PARTIAL_OVERLAP:
-                comparison_groups["Partial Overlaps"].append(comp)
-            elif comp.overlap_type == OverlapType.CONCEPT_MISMATCH:
-                comparison_groups["Concept Mismatches"].append(comp)
-            elif comp.overlap_type == OverlapType.NO_OVERLAP:
-                if comp.agent_span and not comp.gold_span:
-                    comparison_groups["Agent Only"].append(comp)
-                elif comp.gold_span and not comp.agent_span:
-                    comparison_groups["Gold Only"].append(comp)
-        
-        for group_name, group_comparisons in comparison_groups.items():
-            if group_comparisons:
-                lines.extend([f"### {group_name}", ""])
-                
-                for comp in group_comparisons:
-                    if comp.agent_span and comp.gold_span:
-                        lines.extend([
-                            f"**Agent:** `[{comp.agent_span.start}-{comp.agent_span.end}]` *\"{comp.agent_span.text}\"* → **{comp.agent_span.concept_name}** (`{comp.agent_span.concept_id}`)",
-                            f"**Gold:**  `[{comp.gold_span.start}-{comp.gold_span.end}]` *\"{comp.gold_span.text}\"* → **{comp.gold_span.concept_name}** (`{comp.gold_span.concept_id}`)",
-                            f"**IoU:** {comp.iou_score:.3f}, **Overlap:** {comp.overlap_length} chars",
-                            ""
-                        ])
-                    elif comp.agent_span:
-                        lines.extend([
-                            f"**Agent:** `[{comp.agent_span.start}-{comp.agent_span.end}]` *\"{comp.agent_span.text}\"* → **{comp.agent_span.concept_name}** (`{comp.agent_span.concept_id}`)",
-                            f"*(No corresponding gold standard span)*",
-                            ""
-                        ])
-                    elif comp.gold_span:
-                        lines.extend([
-                            f"**Gold:**  `[{comp.gold_span.start}-{comp.gold_span.end}]` *\"{comp.gold_span.text}\"* → **{comp.gold_span.concept_name}** (`{comp.gold_span.concept_id}`)",
-                            f"*(Missed by agent)*",
-                            ""
-                        ])
-        
-        # Add original text section if provided
-        if note_text:
-            lines.extend([
-                "## Original Note Text",
-                "",
-                "```",
-                note_text,
-                "```",
-                "",
-                "---",
-                "",
-                "### Character Position Reference",
-                "",
-                "To help with debugging, here are some character position markers:",
-                ""
-            ])
-            
-            # Add position markers every 100 characters
-            text_length = len(note_text)
-            for i in range(0, text_length, 100):
-                end_pos = min(i + 100, text_length)
-                snippet = note_text[i:end_pos].replace('\n', '\\n')
-                lines.append(f"- **{i:4d}-{end_pos:4d}:** `{snippet[:50]}{'...' if len(snippet) > 50 else ''}`")
-        
-        # Save visualization
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write('\n'.join(lines))
+        # Nothing to show for a note without spans on either side
+        if not note_stats["comparisons"]:
+            return None
         
-        logging.info(f"Span visualization saved to {output_path}")
-        return output_path
+        return _write_span_visualization(note_id, note_stats, output_path, note_text)
+
+
+# Markdown templates for _write_span_visualization
+_VIZ_HEADER = """# Span Analysis for Note: {note_id}
+
+## Summary Statistics
+
+- **Agent Spans:** {agent_span_count}
+- **Gold Standard Spans:** {gold_span_count}
+- **Exact Matches:** {exact_matches}
+- **Partial Overlaps:** {partial_overlaps}
+- **Concept Mismatches:** {concept_mismatches}
+- **Agent Only (False Positives):** {agent_only_spans}
+- **Gold Only (Missed):** {gold_only_spans}
+
+## Detailed Span Comparisons
+
+"""
+_VIZ_AGENT_LINE = '**Agent:** `[{span.start}-{span.end}]` *"{span.text}"* → **{span.concept_name}** (`{span.concept_id}`)\n'
+_VIZ_GOLD_LINE = '**Gold:**  `[{span.start}-{span.end}]` *"{span.text}"* → **{span.concept_name}** (`{span.concept_id}`)\n'
+_VIZ_SCORE_LINE = "**IoU:** {comp.iou_score:.3f}, **Overlap:** {comp.overlap_length} chars\n\n"
+_VIZ_TEXT_SECTION = """## Original Note Text
+
+```
+{note_text}
+```
+
+---
+
+### Character Position Reference
+
+To help with debugging, here are some character position markers:
+
+"""
+
+
+def _write_span_visualization(note_id: str, note_stats: Dict[str, Any], output_path: str,
+                              note_text: str = None) -> str:
+    """Write the markdown visualization for one note's analysis stats
+
+    Module-level so that per-note rendering can be dispatched to worker processes.
+    """
+    comparisons = note_stats["comparisons"]
+    
+    # Create markdown visualization
+    buf = io.StringIO()
+    buf.write(_VIZ_HEADER.format(note_id=note_id, **note_stats))
+    
+    # Group comparisons by type for better organization
+    comparison_groups = {
+        "Exact Matches": [],
+        "Partial Overlaps": [],
+        "Concept Mismatches": [],
+        "Agent Only": [],
+        "Gold Only": []
+    }
+    
+    for comp in comparisons:
+        if comp.overlap_type == OverlapType.EXACT_MATCH:
+            comparison_groups["Exact Matches"].append(comp)
+        elif comp.overlap_type == OverlapType.PARTIAL_OVERLAP:
+            comparison_groups["Partial Overlaps"].append(comp)
+        elif comp.overlap_type == OverlapType.CONCEPT_MISMATCH:
+            comparison_groups["Concept Mismatches"].append(comp)
+        elif comp.overlap_type == OverlapType.NO_OVERLAP:
+            if comp.agent_span and not comp.gold_span:
+                comparison_groups["Agent Only"].append(comp)
+            elif comp.gold_span and not comp.agent_span:
+                comparison_groups["Gold Only"].append(comp)
+    
+    for group_name, group_comparisons in comparison_groups.items():
+        if group_comparisons:
+            buf.write(f"### {group_name}\n\n")
+    
+            for comp in group_comparisons:
+                if comp.agent_span and comp.gold_span:
+                    buf.write(_VIZ_AGENT_LINE.format(span=comp.agent_span))
+                    buf.write(_VIZ_GOLD_LINE.format(span=comp.gold_span))
+                    buf.write(_VIZ_SCORE_LINE.format(comp=comp))
+                elif comp.agent_span:
+                    buf.write(_VIZ_AGENT_LINE.format(span=comp.agent_span))
+                    buf.write("*(No corresponding gold standard span)*\n\n")
+                elif comp.gold_span:
+                    buf.write(_VIZ_GOLD_LINE.format(span=comp.gold_span))
+                    buf.write("*(Missed by agent)*\n\n")
+    
+    # Add original text section if provided
+    if note_text:
+        buf.write(_VIZ_TEXT_SECTION.format(note_text=note_text))
+    
+        # Add position markers every 100 characters
+        text_length = len(note_text)
+        for i in range(0, text_length, 100):
+            end_pos = min(i + 100, text_length)
+            snippet = note_text[i:end_pos].replace('\n', '\\n')
+            buf.write(f"- **{i:4d}-{end_pos:4d}:** `{snippet[:50]}{'...' if len(snippet) > 50 else ''}`\n")
+    
+    # Save visualization
+    with open(output_path, 'w', encoding='utf-8') as f:
+        f.write(buf.getvalue())
+    
+    logging.info(f"Span visualization saved to {output_path}")
+    return output_path
 
 
 def main():
@@ -609,13 +727,18 @@ def main():
     analyzer.generate_enhanced_summary(results, str(summary_path))
     
     # Create visualizations for each note
-    note_ids = set()
-    for span in agent_spans + gold_spans:
-        note_ids.add(span.note_id)
+    note_ids = np.unique(np.concatenate([agent_spans.note_ids, gold_spans.note_ids])).tolist()
+    by_note_id = results["statistics"]["by_note_id"]
+    note_ids = [note_id for note_id in note_ids if by_note_id[note_id]["comparisons"]]
     
-    for note_id in note_ids:
-        viz_path = output_dir / f"span_visualization_{note_id}.txt"
-        analyzer.create_span_visualization(results, note_id, str(viz_path))
+    # Each note renders independently, so spread them across processes
+    with ProcessPoolExecutor() as executor:
+        list(executor.map(
+            _write_span_visualization,
+            note_ids,
+            [by_note_id[note_id] for note_id in note_ids],
+            [str(output_dir / f"span_visualization_{note_id}.txt") for note_id in note_ids]
+        ))
     
     logging.info(f"Analysis complete. Results saved to {output_dir}")
 
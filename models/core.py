@@ -1,61 +1,71 @@
 """Core domain models for SNOBot."""
 
+from dataclasses import dataclass
 from pydantic import Field
-from pydantic.dataclasses import dataclass
+from pydantic.dataclasses import dataclass as pydantic_dataclass
 from typing import Optional
 import yaml
 
+# Use libyaml's C emitter when PyYAML was built against it; the pure-Python
+# SafeDumper produces the same output, just much more slowly.
+_YAML_DUMPER = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
 
-@dataclass
+
+def _dump_yaml(data: dict) -> str:
+    """Serialize a plain dict to block-style YAML, preserving key order."""
+    return yaml.dump(data, Dumper=_YAML_DUMPER, default_flow_style=False, sort_keys=False)
+
+
+@pydantic_dataclass
 class Mention:
     """A potential OMOP concept mention found in text."""
     mention_str: str = Field(..., description="The string containing a potential OMOP concept or synonym to identify.")
 
 
-@dataclass
+@pydantic_dataclass
 class MentionList:
     """A list of potential OMOP concept mentions."""
     mentions: list[Mention] = Field(..., description="A list of potential OMOP concepts or synonyms to identify.")
 
 
-@dataclass
+@pydantic_dataclass
 class AgentCodedConcept:
     """A concept coded by the AI agent with basic information."""
-    concept_id: str = Field(..., description="The OMOP concept ID.")
+    concept_id: int = Field(..., description="The OMOP concept ID.")
     concept_name: str = Field(..., description="The OMOP concept name.")
     negated: bool = Field(False, description="Whether the concept is negated in the input text.")
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class ConceptRelation:
     """Represents a parent or child concept relationship."""
-    concept_id: str = Field(..., description="The related concept ID.")
-    concept_name: str = Field(..., description="The related concept name.")
+    concept_id: int  # The related concept ID
+    concept_name: str  # The related concept name
     
     def to_dict(self) -> dict:
         """Convert to dictionary for YAML serialization."""
         return {
-            "concept_id": self.concept_id,
+            "concept_id": str(self.concept_id),
             "concept_name": self.concept_name
         }
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class EnhancedConcept:
     """Enhanced concept with hierarchical information for agent reasoning."""
-    concept_id: str = Field(..., description="The OMOP concept ID.")
-    concept_name: str = Field(..., description="The OMOP concept name.")
-    domain_id: str = Field(..., description="The OMOP domain ID.")
-    vocabulary_id: str = Field(..., description="The OMOP vocabulary ID.")
-    concept_code: str = Field(..., description="The OMOP concept code.")
-    standard: bool = Field(False, description="Whether this is a standard OMOP concept.")
-    parent_concepts: Optional[list[ConceptRelation]] = Field(default=None, description="Parent concepts in the hierarchy.")
-    child_concepts: Optional[list[ConceptRelation]] = Field(default=None, description="Child concepts in the hierarchy.")
+    concept_id: int  # The OMOP concept ID
+    concept_name: str  # The OMOP concept name
+    domain_id: str  # The OMOP domain ID
+    vocabulary_id: str  # The OMOP vocabulary ID
+    concept_code: str  # The OMOP concept code
+    standard: bool = False  # Whether this is a standard OMOP concept
+    parent_concepts: Optional[list[ConceptRelation]] = None  # Parent concepts in the hierarchy
+    child_concepts: Optional[list[ConceptRelation]] = None  # Child concepts in the hierarchy
     
     def to_dict(self) -> dict:
         """Convert to dictionary for YAML serialization."""
         result = {
-            "concept_id": self.concept_id,
+            "concept_id": str(self.concept_id),
             "concept_name": self.concept_name,
             "domain_id": self.domain_id,
             "vocabulary_id": self.vocabulary_id,
@@ -73,15 +83,15 @@ class EnhancedConcept:
     
     def to_yaml(self) -> str:
         """Convert to YAML string representation."""
-        return yaml.safe_dump(self.to_dict(), default_flow_style=False, sort_keys=False)
+        return _dump_yaml(self.to_dict())
 
 
-@dataclass
+@dataclass(slots=True)
 class ConceptCollection:
     """A collection of concepts with metadata for agent reasoning."""
-    concepts: list[EnhancedConcept] = Field(..., description="List of concept candidates.")
-    search_query: Optional[str] = Field(default=None, description="The search query used to find these concepts.")
-    total_count: Optional[int] = Field(default=None, description="Total number of concepts found.")
+    concepts: list[EnhancedConcept]  # List of concept candidates
+    search_query: Optional[str] = None  # The search query used to find these concepts
+    total_count: Optional[int] = None  # Total number of concepts found
     
     def to_dict(self) -> dict:
         """Convert to dictionary for YAML serialization."""
@@ -99,26 +109,26 @@ class ConceptCollection:
     
     def to_yaml(self) -> str:
         """Convert to YAML string representation."""
-        return yaml.safe_dump(self.to_dict(), default_flow_style=False, sort_keys=False)
+        return _dump_yaml(self.to_dict())
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class FullCodedConcept:
     """A fully coded concept with complete OMOP metadata."""
-    mention_str: str = Field(..., description="The string containing a potential OMOP concept or synonym to identify.")
-    concept_id: str = Field(..., description="The OMOP concept ID.")
-    concept_name: str = Field(..., description="The OMOP concept name.")
-    domain_id: str = Field(..., description="The OMOP domain ID.")
-    vocabulary_id: str = Field(..., description="The OMOP vocabulary ID.")
-    concept_code: str = Field(..., description="The OMOP concept code.")
-    standard: bool = Field(False, description="Whether this is a standard OMOP concept (True if 'S', False otherwise).")
-    negated: bool = Field(False, description="Whether the concept is negated in the input text.")
+    mention_str: str  # The string containing a potential OMOP concept or synonym to identify
+    concept_id: int  # The OMOP concept ID
+    concept_name: str  # The OMOP concept name
+    domain_id: str  # The OMOP domain ID
+    vocabulary_id: str  # The OMOP vocabulary ID
+    concept_code: str  # The OMOP concept code
+    standard: bool = False  # Whether this is a standard OMOP concept (True if 'S', False otherwise)
+    negated: bool = False  # Whether the concept is negated in the input text
     
     def to_dict(self) -> dict:
         """Convert to dictionary for easier serialization."""
         return {
             "mention_str": self.mention_str,
-            "concept_id": self.concept_id,
+            "concept_id": str(self.concept_id),
             "concept_name": self.concept_name,
             "domain_id": self.domain_id,
             "vocabulary_id": self.vocabulary_id,
@@ -1,12 +1,12 @@
 """Database-related models for SNOBot."""
 
-from pydantic.dataclasses import dataclass
+from dataclasses import dataclass
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class VecDBHit:
     """A hit result from vector database search."""
     search_string: str
-    concept_id: str
+    concept_id: int
     concept_name: str
     distance: float
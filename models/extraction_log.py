@@ -1,41 +1,78 @@
 """Extraction process logging models and utilities."""
 
-from pydantic import Field
-from pydantic.dataclasses import dataclass
-from typing import Optional, Any, Dict, List
+from dataclasses import dataclass, field
+from typing import Optional, Any, Dict, Iterator, List, Mapping
 from datetime import datetime
 import json
+import orjson
+import time
 import yaml
-from dataclasses import asdict
 
+class _EmptyPayload(Mapping[str, Any]):
+    """Read-only empty mapping that pickles by reference, so the singleton survives a round trip."""
+    __slots__ = ()
 
-@dataclass
+    def __getitem__(self, key: str) -> Any:
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(())
+
+    def __len__(self) -> int:
+        return 0
+
+    def __repr__(self) -> str:
+        return "{}"
+
+    def __reduce__(self) -> str:
+        return "_EMPTY"
+
+
+# Shared, immutable stand-in for "no data" on LogStep payload fields, so readers can
+# test membership directly instead of None-checking first.
+_EMPTY: Mapping[str, Any] = _EmptyPayload()
+
+
+def _plain(data: Mapping[str, Any]) -> Dict[str, Any]:
+    """Swap the read-only empty sentinel for a real (JSON-serializable) dict."""
+    return {} if data is _EMPTY else data
+
+
+@dataclass(slots=True)
 class LogStep:
     """A single step in the extraction process."""
-    step_type: str = Field(..., description="Type of step (e.g., 'mention_identification', 'vector_search', 'concept_coding')")
-    description: str = Field(..., description="Human-readable description of the step")
-    timestamp: datetime = Field(default_factory=datetime.now, description="When this step occurred")
-    input_data: Optional[Dict[str, Any]] = Field(default=None, description="Input parameters for this step")
-    output_data: Optional[Dict[str, Any]] = Field(default=None, description="Output results from this step")
-    metadata: Optional[Dict[str, Any]] = Field(default=None, description="Additional metadata about the step")
-    duration_ms: Optional[float] = Field(default=None, description="How long this step took in milliseconds")
-    error: Optional[str] = Field(default=None, description="Error message if step failed")
+    step_type: str  # Type of step (e.g., 'mention_identification', 'vector_search', 'concept_coding')
+    description: str  # Human-readable description of the step
+    timestamp: datetime = field(default_factory=datetime.now)  # When this step occurred
+    input_data: Mapping[str, Any] = field(default_factory=lambda: _EMPTY)  # Input parameters for this step
+    output_data: Mapping[str, Any] = field(default_factory=lambda: _EMPTY)  # Output results from this step
+    metadata: Mapping[str, Any] = field(default_factory=lambda: _EMPTY)  # Additional metadata about the step
+    duration_ms: Optional[float] = None  # How long this step took in milliseconds
+    error: Optional[str] = None  # Error message if step failed
     
     def to_dict(self) -> dict:
         """Convert to dictionary for serialization."""
-        result = asdict(self)
-        # Convert datetime to ISO string for JSON serialization
-        if isinstance(result['timestamp'], datetime):
-            result['timestamp'] = result['timestamp'].isoformat()
-        return result
+        # Built by hand rather than via asdict(), which deep-copies the
+        # (already JSON-safe) input/output payloads on every call
+        return {
+            "step_type": self.step_type,
+            "description": self.description,
+            # Convert datetime to ISO string for JSON serialization
+            "timestamp": self.timestamp.isoformat() if isinstance(self.timestamp, datetime) else self.timestamp,
+            "input_data": _plain(self.input_data),
+            "output_data": _plain(self.output_data),
+            "metadata": _plain(self.metadata),
+            "duration_ms": self.duration_ms,
+            "error": self.error
+        }
 
 
-@dataclass
+@dataclass(slots=True)
 class MentionCodingLog:
     """Log for coding a specific mention, containing all sub-steps."""
-    mention: str = Field(..., description="The mention being coded")
-    steps: List[LogStep] = Field(default_factory=list, description="All steps taken to code this mention")
-    final_result: Optional[Dict[str, Any]] = Field(default=None, description="Final coded concept result")
+    mention: str  # The mention being coded
+    steps: List[LogStep] = field(default_factory=list)  # All steps taken to code this mention
+    final_result: Optional[Dict[str, Any]] = None  # Final coded concept result
     
     def add_step(self, step: LogStep):
         """Add a step to this mention's coding process."""
@@ -50,17 +87,17 @@ class MentionCodingLog:
         }
 
 
-@dataclass
+@dataclass(slots=True)
 class ExtractionProcessLog:
     """Complete log of the extraction process."""
-    input_text: str = Field(..., description="The original input text")
-    process_id: str = Field(..., description="Unique identifier for this extraction process")
-    start_time: datetime = Field(default_factory=datetime.now, description="When extraction started")
-    end_time: Optional[datetime] = Field(default=None, description="When extraction completed")
-    steps: List[LogStep] = Field(default_factory=list, description="Top-level process steps")
-    mention_logs: List[MentionCodingLog] = Field(default_factory=list, description="Detailed logs for each mention")
-    final_results: List[Dict[str, Any]] = Field(default_factory=list, description="Final coded concepts")
-    metadata: Dict[str, Any] = Field(default_factory=dict, description="Process metadata")
+    input_text: str  # The original input text
+    process_id: str  # Unique identifier for this extraction process
+    start_time: datetime = field(default_factory=datetime.now)  # When extraction started
+    end_time: Optional[datetime] = None  # When extraction completed
+    steps: List[LogStep] = field(default_factory=list)  # Top-level process steps
+    mention_logs: List[MentionCodingLog] = field(default_factory=list)  # Detailed logs for each mention
+    final_results: List[Dict[str, Any]] = field(default_factory=list)  # Final coded concepts
+    metadata: Dict[str, Any] = field(default_factory=dict)  # Process metadata
     
     def add_step(self, step: LogStep):
         """Add a top-level step to the process."""
@@ -102,7 +139,7 @@ class ExtractionProcessLog:
         
         # Aggregate from top-level steps
         for step in self.steps:
-            if step.output_data and 'usage_stats' in step.output_data:
+            if 'usage_stats' in step.output_data:
                 usage = step.output_data['usage_stats']
                 total_requests += usage.get('requests', 0)
                 total_request_tokens += usage.get('request_tokens', 0)
@@ -110,7 +147,7 @@ class ExtractionProcessLog:
                 total_tokens += usage.get('total_tokens', 0)
                 
                 # Track models used and calculate cost
-                if step.input_data and 'model' in step.input_data:
+                if 'model' in step.input_data:
                     model_name = step.input_data['model']
                     models_used.add(model_name)
                     model_config = get_model_config(model_name)
@@ -128,7 +165,7 @@ class ExtractionProcessLog:
         # Aggregate from mention-level steps
         for mention_log in self.mention_logs:
             for step in mention_log.steps:
-                if step.output_data and 'usage_stats' in step.output_data:
+                if 'usage_stats' in step.output_data:
                     usage = step.output_data['usage_stats']
                     total_requests += usage.get('requests', 0)
                     total_request_tokens += usage.get('request_tokens', 0)
@@ -136,7 +173,7 @@ class ExtractionProcessLog:
                     total_tokens += usage.get('total_tokens', 0)
                     
                     # Track models used and calculate cost
-                    if step.input_data and 'model' in step.input_data:
+                    if 'model' in step.input_data:
                         model_name = step.input_data['model']
                         models_used.add(model_name)
                         model_config = get_model_config(model_name)
@@ -179,8 +216,32 @@ class ExtractionProcessLog:
         return result
     
     def to_json(self, indent: int = 2) -> str:
-        """Convert to JSON string."""
-        return json.dumps(self.to_dict(), indent=indent, ensure_ascii=False)
+        """Convert to JSON string.
+
+        The default ``indent=2`` is encoded with orjson. Its output is equivalent JSON to
+        stdlib json's at the same indent, but not byte-identical: small floats are spelled
+        differently (orjson writes ``0.00005``/``1e-7`` where json writes ``5e-05``/``1e-07``,
+        which sub-millisecond ``duration_ms`` values can hit) and NaN/Infinity become
+        ``null``. Any other indent, including ``0`` (newline-separated) and ``None``
+        (single line with ", "/": " separators), goes through stdlib json unchanged.
+        """
+        if indent != 2:
+            return json.dumps(self.to_dict(), indent=indent, ensure_ascii=False)
+        # Same document as to_dict(), but the step/mention dataclasses and datetimes
+        # are handed to orjson as-is and serialized natively in a single pass
+        tree = {
+            "input_text": self.input_text,
+            "process_id": self.process_id,
+            "start_time": self.start_time,
+            "end_time": self.end_time,
+            "total_duration_ms": self.get_total_duration_ms(),
+            "steps": self.steps,
+            "mention_logs": self.mention_logs,
+            "final_results": self.final_results,
+            "metadata": self.metadata
+        }
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_INDENT_2
+        return orjson.dumps(tree, default=_plain, option=option).decode()
     
     def to_markdown_report(self) -> str:
         """Generate a markdown report from the log."""
@@ -197,12 +258,13 @@ class ExtractionLogger:
             process_id=process_id
         )
         self.current_mention_log: Optional[MentionCodingLog] = None
-        self._step_start_times: Dict[str, datetime] = {}
+        # monotonic perf_counter_ns() readings, keyed by step id
+        self._step_start_times: Dict[str, int] = {}
     
     def start_step(self, step_id: str, step_type: str, description: str, 
                    input_data: Optional[Dict[str, Any]] = None) -> str:
         """Start timing a step and return the step ID."""
-        self._step_start_times[step_id] = datetime.now()
+        self._step_start_times[step_id] = time.perf_counter_ns()
         return step_id
     
     def log_step(self, step_type: str, description: str, 
@@ -216,16 +278,16 @@ class ExtractionLogger:
         # Calculate duration if we have a start time
         duration_ms = None
         if step_id and step_id in self._step_start_times:
-            start_time = self._step_start_times[step_id]
-            duration_ms = (datetime.now() - start_time).total_seconds() * 1000
-            del self._step_start_times[step_id]
+            start_ns = self._step_start_times.pop(step_id)
+            duration_ms = (time.perf_counter_ns() - start_ns) / 1e6
         
         step = LogStep(
             step_type=step_type,
             description=description,
-            input_data=input_data,
-            output_data=output_data,
-            metadata=metadata,
+            timestamp=datetime.now(),
+            input_data=input_data or _EMPTY,
+            output_data=output_data or _EMPTY,
+            metadata=metadata or _EMPTY,
             duration_ms=duration_ms,
             error=error
         )
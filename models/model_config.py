@@ -1,22 +1,28 @@
 """Model configuration and pricing information."""
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from functools import lru_cache
 from typing import Dict, Optional
 
 
-@dataclass
+@dataclass(slots=True)
 class ModelConfig:
     """Configuration for a language model including pricing."""
     name: str
     input_cost_per_million: float  # Cost per million input tokens
     output_cost_per_million: float  # Cost per million output tokens
     display_name: Optional[str] = None
+    # Per-token rates, derived from the per-million prices in __post_init__
+    _input_rate: float = field(init=False, repr=False, compare=False)
+    _output_rate: float = field(init=False, repr=False, compare=False)
+    
+    def __post_init__(self):
+        self._input_rate = self.input_cost_per_million / 1_000_000
+        self._output_rate = self.output_cost_per_million / 1_000_000
     
     def calculate_cost(self, input_tokens: int, output_tokens: int) -> float:
         """Calculate total cost for given token usage."""
-        input_cost = (input_tokens / 1_000_000) * self.input_cost_per_million
-        output_cost = (output_tokens / 1_000_000) * self.output_cost_per_million
-        return input_cost + output_cost
+        return input_tokens * self._input_rate + output_tokens * self._output_rate
     
     def get_display_name(self) -> str:
         """Get the display name for this model."""
@@ -37,8 +43,13 @@ MODEL_CONFIGS: Dict[str, ModelConfig] = {
 DEFAULT_MODEL = "gpt-4.1"
 
 
+@lru_cache(maxsize=None)
 def get_model_config(model_name: str) -> ModelConfig:
-    """Get configuration for a model, with fallback to default pricing."""
+    """Get configuration for a model, with fallback to default pricing.
+
+    Cached: MODEL_CONFIGS is a module-level constant, so each name always
+    resolves to the same (shared) ModelConfig instance.
+    """
     if model_name in MODEL_CONFIGS:
         return MODEL_CONFIGS[model_name]
     
@@ -1,11 +1,11 @@
 """UI-related models for SNOBot."""
 
 from dataclasses import dataclass
-from typing import List
+from typing import Tuple
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class Settings:
-    """Configuration settings for the UI."""
+    """Configuration settings for the UI (immutable and hashable, so usable as a cache key)."""
     backend: str
-    domains: List[str]
+    domains: Tuple[str, ...]
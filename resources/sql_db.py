@@ -1,7 +1,9 @@
 import duckdb
+import pyarrow as pa
 import os
 import logging
 import sys
+from typing import Any, Optional, Sequence
 
 # Configure logging to output to stdout (which gets captured by systemd)
 logging.basicConfig(
@@ -13,6 +15,14 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Settings for every read-only connection to the vocabulary. DuckDB shares one database
+# instance per file within a process and refuses a second connection with a different
+# configuration, so all read-only connects must use exactly this dict.
+READ_ONLY_CONFIG = {
+    "memory_limit": "2GB",
+    "threads": str(os.cpu_count() or 1),
+}
+
 class SqlDB:
     def __init__(self):
         self.csvs = {
@@ -30,12 +40,21 @@ class SqlDB:
 
         self.init_db()
 
+        # The vocabulary is static once loaded, so a single long-lived read-only
+        # connection is shared by every query; see run_query.
+        self.conn = self._connect_read_only()
+
+    def _connect_read_only(self) -> duckdb.DuckDBPyConnection:
+        """Open a read-only connection to the (already initialized) vocabulary database."""
+        return duckdb.connect(self.db_path, read_only=True, config=READ_ONLY_CONFIG)
+
     def init_db(self):
         """Initialize the DuckDB database and load OMOP vocab data."""
         # check if the database already exists, and if it has any tables
         if os.path.exists(self.db_path):
-            conn = duckdb.connect(self.db_path)
-            tables = conn.execute("SHOW TABLES;").fetchall()
+            # read-only to match the persistent connection (see READ_ONLY_CONFIG)
+            with self._connect_read_only() as conn:
+                tables = conn.execute("SHOW TABLES;").fetchall()
             if tables:
                 logger.info(f"SQL Database already initialized with tables: {[table[0] for table in tables]}")
                 return
@@ -43,6 +62,11 @@ class SqlDB:
         # Connect to DuckDB
         logger.info("Initializing SQL Database with OMOP vocabulary tables...")
         conn = duckdb.connect(self.db_path)
+        # bulk-load settings: use every core, and let the CSV scans run in
+        # parallel without having to keep rows in file order
+        conn.execute(f"SET threads = {os.cpu_count() or 1};")
+        conn.execute("SET preserve_insertion_order = false;")
+        conn.execute("SET enable_progress_bar = false;")
 
         # Create tables and load data
         conn.execute("""
@@ -123,19 +147,36 @@ class SqlDB:
         # Load data from CSV files
         for table, csv in self.csvs.items():
             logger.info(f"Loading data into {table} table from {csv}...")
-            conn.execute(f"INSERT INTO {table} SELECT * FROM read_csv_auto('{csv}', sep='\t');")
-            
-            # Get row count for logging
-            row_count = conn.execute(f"SELECT COUNT(*) FROM {table};").fetchone()[0]
+            # COPY reports the number of rows loaded, so no separate COUNT(*) scan
+            row_count = conn.execute(f"COPY {table} FROM '{csv}' (DELIMITER '\t', HEADER, AUTO_DETECT TRUE);").fetchone()[0]
             logger.info(f"Loaded {row_count:,} rows into {table} table")
 
         conn.commit()
         conn.close()
         logger.info("SQL Database initialization complete!")
 
-    def run_query(self, query: str):
-        """Run a SQL query against the DuckDB database."""
-        conn = duckdb.connect(self.db_path)
-        result = conn.execute(query).fetchall()
-        conn.close()
-        return result
\ No newline at end of file
+    def run_query(self, query: str, params: Optional[Sequence[Any]] = None):
+        """Run a SQL query against the DuckDB database.
+
+        Values should be passed as ``?`` placeholders in ``params`` rather than
+        formatted into the SQL text, so they are bound (and quoted) by DuckDB.
+        """
+        # a cursor per call keeps concurrent Streamlit sessions from sharing
+        # in-flight result state on the one underlying connection
+        cur = self.conn.cursor()
+        try:
+            return cur.execute(query, params).fetchall()
+        finally:
+            cur.close()
+
+    def run_query_arrow(self, query: str, params: Optional[Sequence[Any]] = None) -> pa.Table:
+        """Run a SQL query and return the result as a columnar Arrow table.
+
+        Avoids materializing a Python tuple per row; prefer this for callers that
+        consume whole columns (e.g. lists of concept ids).
+        """
+        cur = self.conn.cursor()
+        try:
+            return cur.execute(query, params).fetch_arrow_table()
+        finally:
+            cur.close()
\ No newline at end of file
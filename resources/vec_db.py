@@ -1,7 +1,15 @@
 from sentence_transformers import SentenceTransformer
 from models.db import VecDBHit
+from collections import OrderedDict
+from typing import Hashable, Optional
 import os
-import pandas as pd
+import threading
+import numpy as np
+import onnxruntime
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+import torch
 import chromadb
 from chromadb.config import Settings
 import logging
@@ -17,13 +25,102 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# CONCEPT.csv columns stored as Chroma metadata alongside each concept's embedding
+METADATA_COLUMNS = ("domain_id", "vocabulary_id", "concept_class_id", "standard_concept", "concept_code")
+
+# Chroma indexes with HNSW already; its defaults (M=16, ef_search=10) are tuned for small
+# collections and lose recall on the millions of OMOP concepts. A denser graph built
+# more carefully keeps top-k recall near exact search at logarithmic query cost.
+HNSW_CONFIGURATION = {"max_neighbors": 32, "ef_construction": 200, "ef_search": 64}
+
+
+def _encoder_threads() -> int:
+    """Threads for CPU encoding (ONNX Runtime, or the PyTorch fallback).
+
+    Both runtimes default to the physical core count, which leaves SMT siblings idle;
+    SNOBOT_ENCODER_THREADS overrides, and a missing or invalid value uses os.cpu_count().
+    """
+    default = os.cpu_count() or 1
+    value = os.environ.get("SNOBOT_ENCODER_THREADS", "").strip()
+    if not value:
+        return default
+    try:
+        threads = int(value)
+    except ValueError:
+        threads = 0
+    if threads < 1:
+        logger.warning(f"Ignoring invalid SNOBOT_ENCODER_THREADS={value!r}, using {default}")
+        return default
+    return threads
+
+
+def _count_lines(path: str, block_size: int = 1 << 24) -> int:
+    """Count newlines in a file by scanning large binary blocks rather than decoding line by line."""
+    with open(path, "rb") as f:
+        return sum(block.count(b"\n") for block in iter(lambda: f.read(block_size), b""))
+
+
+class _LastHiddenState(torch.nn.Module):
+    """Export wrapper exposing a Hugging Face encoder as (input_ids, attention_mask) -> last_hidden_state."""
+
+    def __init__(self, model: torch.nn.Module):
+        super().__init__()
+        self.model = model
+
+    def forward(self, input_ids, attention_mask):
+        return self.model(input_ids=input_ids, attention_mask=attention_mask).last_hidden_state
+
+
+class QueryCache:
+    """Thread-safe LRU cache of query results, keyed exactly by query text plus search options.
+
+    There is deliberately no near-duplicate (embedding similarity) fallback: distinct
+    clinical phrases can sit within a cosine of 0.99 of each other under e5, and reusing a
+    neighbour's hits would silently give one mention another mention's concepts.
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._hits: OrderedDict[Hashable, list[VecDBHit]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[list[VecDBHit]]:
+        """Return cached hits for an exact key, or None."""
+        with self._lock:
+            hits = self._hits.get(key)
+            if hits is not None:
+                self._hits.move_to_end(key)
+            return hits
+
+    def put(self, key: Hashable, hits: list[VecDBHit]) -> None:
+        """Cache hits for a query, evicting the least recently used entry when full."""
+        with self._lock:
+            self._hits[key] = hits
+            self._hits.move_to_end(key)
+            if len(self._hits) > self.maxsize:
+                self._hits.popitem(last=False)
+
 
 class VecDB:
     def __init__(self):
         self.embedding_model_name = "intfloat/e5-small-v2"
         # strings should be prefixed with "query:" for intfloat models
         self.embedding_prefix = "query:" if "intfloat" in self.embedding_model_name else ""
-        self.embedding_model = SentenceTransformer(self.embedding_model_name)
+        self.device = "cuda" if torch.cuda.is_available() else "cpu"
+        self.embedding_model = SentenceTransformer(self.embedding_model_name, device=self.device)
+        self.onnx_model_path = f"resources/omop_vocab/{self.embedding_model_name.split('/')[-1]}.onnx"
+        if self.device == "cuda":
+            # On GPU the fp16 PyTorch model is the fast path
+            self.embedding_model.half()
+            self.ort_session = None
+        else:
+            # Set here rather than at import so only processes that actually encode
+            # change torch's global thread pool
+            self.encoder_threads = _encoder_threads()
+            torch.set_num_threads(self.encoder_threads)
+            # On CPU the encoder is exported once to ONNX and run through ONNX Runtime,
+            # which is several times faster than the PyTorch graph; see encode()
+            self.ort_session = self._load_onnx_session()
         
         self.source_concept_file = "resources/omop_vocab/CONCEPT.csv"
         # ChromaDB persistent storage directory
@@ -34,6 +131,96 @@ class VecDB:
         self.client = chromadb.PersistentClient(path=self.chroma_db_path)
         self.collection = self.client.get_or_create_collection(name=self.collection_name)
 
+        # clinical text repeats the same mentions constantly; skip the encode and the
+        # nearest-neighbour search for exact queries we've already answered
+        self.query_cache = QueryCache()
+        # the same text is often searched with different top_k / domain filters, which
+        # the result cache keys apart; remember its embedding on its own
+        self._query_embeddings: OrderedDict[str, np.ndarray] = OrderedDict()
+        self._query_embeddings_lock = threading.Lock()
+
+
+    def _load_onnx_session(self) -> Optional[onnxruntime.InferenceSession]:
+        """Export the transformer to ONNX if needed and open an ONNX Runtime session for it.
+
+        Returns None (so encode() falls back to SentenceTransformer) if export or loading fails.
+        """
+        try:
+            if not os.path.exists(self.onnx_model_path):
+                logger.info(f"Exporting {self.embedding_model_name} to ONNX at {self.onnx_model_path}...")
+                hf_model = _LastHiddenState(self.embedding_model[0].auto_model).eval()
+                dummy = self.embedding_model.tokenizer(["query: example"], return_tensors="pt")
+                dynamic_axes = {"input_ids": {0: "batch", 1: "seq"}, "attention_mask": {0: "batch", 1: "seq"},
+                                "last_hidden_state": {0: "batch", 1: "seq"}}
+                with torch.no_grad():
+                    torch.onnx.export(
+                        hf_model,
+                        (dummy["input_ids"], dummy["attention_mask"]),
+                        self.onnx_model_path,
+                        input_names=["input_ids", "attention_mask"],
+                        output_names=["last_hidden_state"],
+                        dynamic_axes=dynamic_axes,
+                        opset_version=17,
+                        dynamo=False,
+                    )
+            session_options = onnxruntime.SessionOptions()
+            session_options.intra_op_num_threads = self.encoder_threads
+            return onnxruntime.InferenceSession(
+                self.onnx_model_path, sess_options=session_options, providers=["CPUExecutionProvider"]
+            )
+        except Exception as e:
+            logger.warning(f"ONNX Runtime encoder unavailable, using SentenceTransformer: {e}")
+            return None
+
+    def embed_query(self, text: str, maxsize: int = 4096) -> np.ndarray:
+        """Embedding for a query text, memoized in an LRU of up to maxsize texts.
+
+        The returned array is shared between callers and marked read-only.
+        """
+        with self._query_embeddings_lock:
+            embedding = self._query_embeddings.get(text)
+            if embedding is not None:
+                self._query_embeddings.move_to_end(text)
+                return embedding
+
+        # encode outside the lock so concurrent queries for different texts don't serialize
+        embedding = self.encode([self.embedding_prefix + text])[0]
+        embedding.flags.writeable = False
+
+        with self._query_embeddings_lock:
+            self._query_embeddings[text] = embedding
+            self._query_embeddings.move_to_end(text)
+            while len(self._query_embeddings) > maxsize:
+                self._query_embeddings.popitem(last=False)
+        return embedding
+
+    def encode(self, texts: list[str]) -> np.ndarray:
+        """Embed texts as L2-normalized float32 vectors, shape (len(texts), dim).
+
+        Mirrors the e5 SentenceTransformer pipeline (transformer -> mean pooling over the
+        attention mask -> normalize) on top of the ONNX Runtime session when available.
+        """
+        if self.ort_session is None:
+            with torch.inference_mode():
+                embeddings = self.embedding_model.encode(
+                    texts, batch_size=256, convert_to_numpy=True,
+                    normalize_embeddings=True, show_progress_bar=False,
+                )
+            return embeddings.astype(np.float32, copy=False)  # fp16 on GPU
+
+        encoded = self.embedding_model.tokenizer(
+            texts, padding=True, truncation=True,
+            max_length=self.embedding_model.max_seq_length, return_tensors="np",
+        )
+        attention_mask = encoded["attention_mask"].astype(np.int64)
+        hidden = self.ort_session.run(
+            ["last_hidden_state"],
+            {"input_ids": encoded["input_ids"].astype(np.int64), "attention_mask": attention_mask},
+        )[0]
+        mask = attention_mask[..., None].astype(np.float32)
+        pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        pooled /= np.linalg.norm(pooled, axis=1, keepdims=True)
+        return pooled
 
     def init_chroma_db(self):
         """Initialize ChromaDB with concept embeddings."""
@@ -52,64 +239,117 @@ class VecDB:
             pass
 
         logger.info("Loading OMOP concepts in batches...")
-        collection = temp_client.get_or_create_collection(name=self.collection_name)
+        collection = temp_client.get_or_create_collection(
+            name=self.collection_name, configuration={"hnsw": HNSW_CONFIGURATION}
+        )
         
         # Process file in chunks to avoid loading everything into memory
-        batch_size = 256
-        chunk_size = 10000  # Read file in 10K row chunks
+        # larger batches only pay off when a GPU has headroom to fill
+        batch_size = 1024 if self.device == "cuda" else 256
+        block_size = 32 << 20  # Read file in 32 MiB blocks (~300K concepts)
+        # Each collection.add is its own write transaction, so flush several encoder
+        # batches at once (capped at what the Chroma backend accepts in one call)
+        add_batch_size = min(8192, temp_client.get_max_batch_size())
         
         # Count total rows first
         logger.info("Counting total concepts...")
-        total_concepts = sum(1 for _ in open(self.source_concept_file)) - 1  # Exclude header
-        processed = 0
+        total_concepts = _count_lines(self.source_concept_file) - 1  # Exclude header
         
         logger.info(f"Generating embeddings and adding to ChromaDB, total concepts: {total_concepts}...")
         
+        # With several GPUs, fan each chunk out over one encoder process per device.
+        # (On CPU, ONNX Runtime already uses every core within a single process.)
+        pool = None
+        if self.device == "cuda" and torch.cuda.device_count() > 1:
+            pool = self.embedding_model.start_multi_process_pool(
+                [f"cuda:{i}" for i in range(torch.cuda.device_count())]
+            )
+        
+        try:
+            self._add_concepts(collection, pool, batch_size, block_size, add_batch_size, total_concepts)
+        finally:
+            if pool is not None:
+                self.embedding_model.stop_multi_process_pool(pool)
+
+        logger.info(f"ChromaDB initialization complete with {collection.count()} concepts.")
+
+    def _add_concepts(self, collection, pool, batch_size: int, block_size: int,
+                      add_batch_size: int, total_concepts: int):
+        """Embed CONCEPT.csv chunk by chunk and add it to the collection."""
+        processed = 0
+        buf_docs, buf_embs, buf_meta, buf_ids = [], [], [], []
+        
+        def flush():
+            collection.add(documents=buf_docs, embeddings=buf_embs, metadatas=buf_meta, ids=buf_ids)
+            buf_docs.clear()
+            buf_embs.clear()
+            buf_meta.clear()
+            buf_ids.clear()
+        
+        # Stream the file as Arrow record batches: multithreaded C tokenizing, every
+        # column kept as text, and empty cells read as missing
+        columns = ["concept_id", "concept_name", *METADATA_COLUMNS]
+        reader = pacsv.open_csv(
+            self.source_concept_file,
+            read_options=pacsv.ReadOptions(block_size=block_size),
+            parse_options=pacsv.ParseOptions(delimiter="\t"),
+            convert_options=pacsv.ConvertOptions(
+                column_types={column: pa.string() for column in columns},
+                include_columns=columns,
+                null_values=[""],
+                strings_can_be_null=True,
+            ),
+        )
+        
         # Process file in chunks
-        for chunk in pd.read_csv(self.source_concept_file, sep="\t", dtype=str, 
-                                keep_default_na=False, na_values=[""], chunksize=chunk_size):
+        for chunk in reader:
+            
+            # Smart batching: order the chunk by name length so each batch pads to the
+            # longest of similar-length names rather than of an arbitrary group. Ids and
+            # metadata travel with their rows, and Chroma doesn't care about insert order.
+            name_lengths = pc.utf8_length(chunk.column("concept_name")).to_numpy(zero_copy_only=False)
+            chunk = chunk.take(pa.array(name_lengths.argsort(kind="stable")))
+            names = chunk.column("concept_name").to_pylist()
+            ids = chunk.column("concept_id").to_pylist()
+            metadatas = [
+                dict(zip(METADATA_COLUMNS, values))
+                for values in zip(*(chunk.column(column).to_pylist() for column in METADATA_COLUMNS))
+            ]
+            texts = [self.embedding_prefix + concept_name for concept_name in names]
+            
+            # Multi-GPU: embed the whole chunk across the pool in one call
+            chunk_embeddings = None
+            if pool is not None:
+                chunk_embeddings = self.embedding_model.encode_multi_process(
+                    texts, pool, batch_size=batch_size, normalize_embeddings=True
+                ).astype(np.float32, copy=False)
             
             # Process each chunk in batches
-            for i in range(0, len(chunk), batch_size):
-                batch = chunk.iloc[i:i + batch_size]
-                
-                # Generate embeddings using your existing logic
-                embeddings = self.embedding_model.encode(
-                    [self.embedding_prefix + concept_name for concept_name in batch["concept_name"].tolist()],
-                    convert_to_tensor=True,
-                    normalize_embeddings=True,
-                )
+            for i in range(0, chunk.num_rows, batch_size):
+                batch_ids = ids[i:i + batch_size]
                 
-                # Convert embeddings to list format for ChromaDB
-                embeddings_list = embeddings.cpu().numpy().tolist()
+                # Generate embeddings
+                if chunk_embeddings is not None:
+                    embeddings = chunk_embeddings[i:i + batch_size]
+                else:
+                    embeddings = self.encode(texts[i:i + batch_size])
                 
-                # Prepare data for ChromaDB
-                documents = batch["concept_name"].tolist()
-                metadatas = [
-                    {
-                        "domain_id": row["domain_id"],
-                        "vocabulary_id": row["vocabulary_id"], 
-                        "concept_class_id": row["concept_class_id"],
-                        "standard_concept": row["standard_concept"],
-                        "concept_code": row["concept_code"]
-                    }
-                    for _, row in batch.iterrows()
-                ]
-                ids = batch["concept_id"].tolist()
+                # Add the buffer to ChromaDB before this batch would overfill it
+                if len(buf_ids) + len(batch_ids) > add_batch_size:
+                    flush()
                 
-                # Add to ChromaDB
-                collection.add(
-                    documents=documents,
-                    embeddings=embeddings_list,
-                    metadatas=metadatas,
-                    ids=ids
-                )
+                # Buffer data for ChromaDB
+                buf_embs.extend(embeddings.tolist())
+                buf_docs.extend(names[i:i + batch_size])
+                buf_meta.extend(metadatas[i:i + batch_size])
+                buf_ids.extend(batch_ids)
                 
-                processed += len(batch)
+                processed += len(batch_ids)
                 if processed % 1000 == 0 or processed == total_concepts:  # Log every 1000 concepts or at completion
                     logger.info(f"Processed {processed} out of {total_concepts} concepts ({processed / total_concepts * 100:.2f}%)")
-
-        logger.info(f"ChromaDB initialization complete with {collection.count()} concepts.")
+        
+        if buf_ids:
+            flush()
     
 
     def query(self, text, top_k=5, domain_filter=None) -> list[VecDBHit]:
@@ -123,12 +363,15 @@ class VecDB:
         if self.collection is None:
             raise ValueError("ChromaDB collection not initialized.")
         
-        # Generate query embedding using your existing logic
-        query_embedding = self.embedding_model.encode(
-            [self.embedding_prefix + text],
-            convert_to_tensor=True,
-            normalize_embeddings=True,
-        ).cpu().numpy().tolist()[0]  # Get the first (and only) embedding from the batch
+        # Cached hits are shared between callers; VecDBHit is frozen, only the list is copied
+        search_options = (top_k, tuple(domain_filter) if domain_filter else None)
+        cache_key = (text, search_options)
+        cached_hits = self.query_cache.get(cache_key)
+        if cached_hits is not None:
+            return list(cached_hits)
+
+        # Generate query embedding
+        query_embedding = self.embed_query(text)
 
         # Build where clause for domain filtering
         where_clause = None
@@ -142,24 +385,23 @@ class VecDB:
 
         # Query ChromaDB
         results = self.collection.query(
-            query_embeddings=[query_embedding],
+            query_embeddings=[query_embedding.tolist()],
             n_results=top_k,
             where=where_clause
         )
         
-        # Convert results to VecDBHit format
-        hits = []
-        for i in range(len(results['ids'][0])):
-            concept_id = results['ids'][0][i]
-            concept_name = results['documents'][0][i]
-            # ChromaDB returns distances, but we want similarity scores
-            # Convert distance to similarity (higher is better)
-            distance = results['distances'][0][i]
-            hits.append(VecDBHit(
-                search_string=text, 
-                concept_id=concept_id, 
-                concept_name=concept_name, 
+        # Convert results to VecDBHit format (Chroma ids are strings)
+        hits = [
+            VecDBHit(
+                search_string=text,
+                concept_id=int(concept_id),
+                concept_name=concept_name,
                 distance=float(distance)
-            ))
+            )
+            for concept_id, concept_name, distance in zip(
+                results['ids'][0], results['documents'][0], results['distances'][0]
+            )
+        ]
         
-        return hits
\ No newline at end of file
+        self.query_cache.put(cache_key, hits)
+        return list(hits)
\ No newline at end of file
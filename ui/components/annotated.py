@@ -1,10 +1,30 @@
 import streamlit as st
-from typing import Any, List
+from typing import Any, Iterator, List, Sequence
+import numpy as np
 import pandas as pd
 import re
+from functools import lru_cache
+from html import escape as _html_escape
 from ui.utils import OMOP_DOMAINS, DOMAIN_COLORS
 from models import FullCodedConcept
 
+def _highlight_layer(hex_color: str) -> str:
+    """CSS background layer tinting a span with hex_color at 45% opacity."""
+    hexcol = hex_color.lstrip("#")
+    rr, gg, bb = int(hexcol[0:2], 16), int(hexcol[2:4], 16), int(hexcol[4:6], 16)
+    return f"linear-gradient(rgba({rr},{gg},{bb},0.45), rgba({rr},{gg},{bb},0.45))"
+
+# Highlight layers are fixed per domain, so build them once rather than per covered segment
+_DOMAIN_LAYERS = {domain: _highlight_layer(color) for domain, color in DOMAIN_COLORS.items()}
+_DEFAULT_LAYER = _highlight_layer("#EEEEEE")
+
+@lru_cache(maxsize=256)
+def _background(domains: tuple) -> str:
+    """Stacked highlight layers for the domains covering a segment, in cover order.
+    Many segments share the same cover, so the joined string is cached per domain tuple.
+    """
+    return ", ".join(_DOMAIN_LAYERS.get(domain, _DEFAULT_LAYER) for domain in domains) or "none"
+
 def render_annotated_component_from_concepts(
     text: str,
     coded_concepts: List[FullCodedConcept],
@@ -20,30 +40,41 @@ def render_annotated_component_from_concepts(
         st.html(f'<div style="white-space: pre-wrap; padding: 16px; border: 1px solid #e7e7e7; border-radius: 10px; background: #fafafa;">{_esc(text)}</div>')
         return
     
+    # Reruns that don't change the text or concepts reuse the highlighted HTML
+    textbox_html = _concepts_textbox_html(text, tuple(coded_concepts))
+    _render_html_with_styles(textbox_html, scroll, max_height_px, tooltip_room_px)
+
+@lru_cache(maxsize=32)
+def _concepts_textbox_html(text: str, coded_concepts: tuple) -> str:
+    """Highlighted HTML for text, memoized on its content (FullCodedConcept is frozen, so hashable)."""
+    # Group concepts by mention string so repeated mentions share one scan of the text
+    # (one alternation regex would be a single pass, but it can't report the nested and
+    # overlapping matches that render as stacked highlights)
+    concepts_by_mention = {}
+    for order, concept in enumerate(coded_concepts):
+        concepts_by_mention.setdefault(concept.mention_str, []).append((order, concept))
+
     # Find all mentions in the text and create spans
     spans = []
-    for concept in coded_concepts:
-        mention = concept.mention_str
+    for mention, concepts in concepts_by_mention.items():
         # Find all occurrences of this mention (case-insensitive)
         for match in re.finditer(re.escape(mention), text, re.IGNORECASE):
-            spans.append({
-                "start": match.start(),
-                "end": match.end(),
-                "concept": concept
-            })
+            for order, concept in concepts:
+                spans.append({
+                    "start": match.start(),
+                    "end": match.end(),
+                    "concept": concept,
+                    "order": order
+                })
     
-    # Sort spans by start position
-    spans.sort(key=lambda x: x["start"])
+    # Sort spans by start position, then by concept order
+    spans.sort(key=lambda x: (x["start"], x["order"]))
     
-    # Create segments with potential overlaps
-    cuts = sorted({0, len(text), *[s["start"] for s in spans], *[s["end"] for s in spans]})
-    segs = []
-    for a, b in zip(cuts[:-1], cuts[1:]):
-        if a == b:
-            continue
-        # Find all concepts that cover this segment
-        cover = [s["concept"] for s in spans if s["start"] < b and s["end"] > a]
-        segs.append({"a": a, "b": b, "cover": cover})
+    # Create segments with potential overlaps, each with the concepts that cover it
+    segs = [
+        {"a": a, "b": b, "cover": [spans[i]["concept"] for i in cover]}
+        for a, b, cover in _segments(len(text), [s["start"] for s in spans], [s["end"] for s in spans])
+    ]
 
     # Build HTML for the text with highlighted segments
     parts = []
@@ -56,13 +87,9 @@ def render_annotated_component_from_concepts(
             continue
 
         # Background as stacked gradients for overlaps
-        layers = []
-        for concept in cover:
-            domain = concept.domain_id if hasattr(concept, 'domain_id') else "Other"
-            hexcol = DOMAIN_COLORS.get(domain, "#EEEEEE").lstrip("#")
-            rr, gg, bb = int(hexcol[0:2], 16), int(hexcol[2:4], 16), int(hexcol[4:6], 16)
-            layers.append(f"linear-gradient(rgba({rr},{gg},{bb},0.45), rgba({rr},{gg},{bb},0.45))")
-        bg = ", ".join(layers) if layers else "none"
+        bg = _background(tuple(
+            concept.domain_id if hasattr(concept, 'domain_id') else "Other" for concept in cover
+        ))
 
         # Tooltip contents - plain text since CSS content doesn't support HTML
         tip = " | ".join(
@@ -74,13 +101,21 @@ def render_annotated_component_from_concepts(
             f'<span class="seg" data-tip="{_esc(tip)}" style="background-image:{bg}">{seg_txt}</span>'
         )
 
-    textbox_html = "".join(parts)
-    _render_html_with_styles(textbox_html, scroll, max_height_px, tooltip_room_px)
+    return "".join(parts)
+
+def _segments(text_len: int, starts: Sequence[int], ends: Sequence[int]) -> Iterator[tuple[int, int, list[int]]]:
+    """Cut [0, text_len) at every span boundary, yielding (a, b, indices of spans covering a..b).
+    Coverage is one vectorized comparison over all spans per segment, in span order.
+    """
+    starts = np.asarray(starts, dtype=np.int64)
+    ends = np.asarray(ends, dtype=np.int64)
+    cuts = np.unique(np.concatenate(([0, text_len], starts, ends))).tolist()
+    for a, b in zip(cuts[:-1], cuts[1:]):
+        yield a, b, np.flatnonzero((starts < b) & (ends > a)).tolist()
 
 def _esc(s: Any) -> str:
     """HTML escape helper function."""
-    s = "" if s is None else str(s)
-    return s.replace("&","&amp;").replace("<","&lt;").replace(">","&gt;")
+    return _html_escape("" if s is None else str(s), quote=False)
 
 def _render_html_with_styles(textbox_html: str, scroll: bool, max_height_px: int, tooltip_room_px: int):
     """Render the HTML with CSS styles."""
@@ -197,13 +232,10 @@ def render_annotated_component_from_df_css(
     rows = [] if df_rows is None or df_rows.empty else df_rows.to_dict(orient="records")
 
     # Segment the text so overlapping spans render correctly
-    cuts = sorted({0, len(text), *[r.get("start", 0) for r in rows], *[r.get("end", 0) for r in rows]})
-    segs = []
-    for a, b in zip(cuts[:-1], cuts[1:]):
-        if a == b:
-            continue
-        cover = [r for r in rows if r.get("start", 0) < b and r.get("end", 0) > a]
-        segs.append({"a": a, "b": b, "cover": cover})
+    segs = [
+        {"a": a, "b": b, "cover": [rows[i] for i in cover]}
+        for a, b, cover in _segments(len(text), [r.get("start", 0) for r in rows], [r.get("end", 0) for r in rows])
+    ]
 
 
 
@@ -218,13 +250,7 @@ def render_annotated_component_from_df_css(
             continue
 
         # Background as stacked gradients for overlaps
-        layers = []
-        for r in cover:
-            dom = r.get("domain", "Other")
-            hexcol = DOMAIN_COLORS.get(dom, "#EEEEEE").lstrip("#")
-            rr, gg, bb = int(hexcol[0:2], 16), int(hexcol[2:4], 16), int(hexcol[4:6], 16)
-            layers.append(f"linear-gradient(rgba({rr},{gg},{bb},0.45), rgba({rr},{gg},{bb},0.45))")
-        bg = ", ".join(layers) if layers else "none"
+        bg = _background(tuple(r.get("domain", "Other") for r in cover))
 
         # Tooltip contents
         tip = _esc(" | ".join(
@@ -3,20 +3,26 @@
 import streamlit as st
 import os
 import base64
+import hmac
+from functools import lru_cache
 from urllib.parse import urlencode
+from markdown_it import MarkdownIt
 
 # Load environment variables (secure in production, local in development)
 import load_env_secure
 
+# Read once at import; None disables password access entirely
+ACCESS_PW = os.getenv("ACCESS_PW")
+
 
 DISCLAIMER_TEXT = """
 Use of SNOMED CT in this software is governed by the conditions of the following SNOMED CT Sub-license issued by [IHTSDO Affiliate Name]
 
-1. The meaning of the terms "Affiliate", or "Data Analysis System", "Data Creation System", "Derivative", "End User", "Extension", "Member", "Non-Member Territory", "SNOMED CT" and "SNOMED CT Content" are as defined in the IHTSDO Affiliate License Agreement (see http://snomed.org/license.pdf).
+1. The meaning of the terms "Affiliate", or "Data Analysis System", "Data Creation System", "Derivative", "End User", "Extension", "Member", "Non-Member Territory", "SNOMED CT" and "SNOMED CT Content" are as defined in the IHTSDO Affiliate License Agreement (see <http://snomed.org/license.pdf>).
 
-2. Information about Affiliate Licensing is available at http://snomed.org/license. Individuals or organizations wishing to register as IHTSDO Affiliates can register at http://snomed.org/salsa, subject to acceptance of the Affiliate License Agreement (see http://snomed.org/license.pdf).
+2. Information about Affiliate Licensing is available at <http://snomed.org/license>. Individuals or organizations wishing to register as IHTSDO Affiliates can register at <http://snomed.org/salsa>, subject to acceptance of the Affiliate License Agreement (see <http://snomed.org/license.pdf>).
 
-3. The current list of IHTSDO Member Territories can be viewed at www.ihtsdo.org/members. Countries not included in that list are "Non-Member Territories".
+3. The current list of IHTSDO Member Territories can be viewed at [www.ihtsdo.org/members](http://www.ihtsdo.org/members). Countries not included in that list are "Non-Member Territories".
 
 4. End Users, that do not hold an IHTSDO Affiliate License, may access SNOMED CT® using this software subject to acceptance of and adherence to the following sub-license limitations:
    a) The sub-licensee is only permitted to access SNOMED CT® using this software (or service) for the purpose of exploring and evaluating the terminology.
@@ -31,6 +37,13 @@ Use of SNOMED CT in this software is governed by the conditions of the following
 """
 
 
+@st.cache_resource
+def _disclaimer_html():
+    """Render DISCLAIMER_TEXT to HTML once per server rather than in the browser on every rerun."""
+    return MarkdownIt("commonmark").render(DISCLAIMER_TEXT)
+
+
+@lru_cache(maxsize=64)
 def _encode_password_for_url(password):
     """Encode password for URL parameter (Base64)."""
     if not password:
@@ -38,6 +51,7 @@ def _encode_password_for_url(password):
     return base64.b64encode(password.encode('utf-8')).decode('utf-8')
 
 
+@lru_cache(maxsize=64)
 def _decode_password_from_url(encoded_password):
     """Decode password from URL parameter (Base64)."""
     if not encoded_password:
@@ -52,13 +66,22 @@ def _get_url_password():
     """Get password from URL parameters if present."""
     query_params = st.query_params
     encoded_pw = query_params.get("pw", "")
-    return _decode_password_from_url(encoded_pw)
+    # Reruns without a URL change reuse the session's last decode
+    cached = st.session_state.get("_url_pw_cache")
+    if cached is None or cached[0] != encoded_pw:
+        cached = (encoded_pw, _decode_password_from_url(encoded_pw))
+        st.session_state._url_pw_cache = cached
+    return cached[1]
+
+
+def _password_matches(password):
+    """Constant-time comparison of a password against ACCESS_PW, ignoring surrounding whitespace."""
+    return hmac.compare_digest(password.strip().encode('utf-8'), ACCESS_PW.strip().encode('utf-8'))
 
 
 def _validate_url_password(password):
     """Validate if the URL password is correct."""
-    access_pw = os.getenv("ACCESS_PW")
-    return access_pw and password.strip() == access_pw.strip()
+    return bool(ACCESS_PW) and _password_matches(password)
 
 
 def _generate_shareable_url(password):
@@ -84,10 +107,10 @@ def show_disclaimer_dialog():
     
     # Display the disclaimer text in a scrollable container
     with st.container(height=300):
-        st.markdown(DISCLAIMER_TEXT)
+        st.html(_disclaimer_html())
     
     # Check if ACCESS_PW environment variable is available
-    access_pw_available = os.getenv("ACCESS_PW") is not None
+    access_pw_available = ACCESS_PW is not None
     
     # Get password from URL if present and validate it
     url_password = _get_url_password()
@@ -163,9 +186,6 @@ def show_disclaimer_dialog():
 
 def _validate_authentication(password, api_key, url_password_valid=False, access_pw_available=True):
     """Validate the provided password or API key."""
-    access_pw = os.getenv("ACCESS_PW")
-    default_api_key = os.getenv("OPENAI_API_KEY")
-    
     # If no ACCESS_PW is available, authentication is not required
     if not access_pw_available:
         return True
@@ -185,15 +205,12 @@ def _validate_authentication(password, api_key, url_password_valid=False, access
     
     # Standard validation for manual entry
     if password:
-        if access_pw is None:
+        if ACCESS_PW is None:
             st.error("❌ ACCESS_PW environment variable not found. Please check your .env file.")
             return False
         
         # Strip whitespace and compare
-        password_clean = password.strip()
-        access_pw_clean = access_pw.strip()
-        
-        if password_clean == access_pw_clean:
+        if _password_matches(password):
             return True
         else:
             st.error(f"❌ Password mismatch.")
@@ -1,7 +1,8 @@
 # bioner_ui/examples.py
-from typing import Dict, List
+from types import MappingProxyType
+from typing import Dict, Mapping, Tuple
 
-EXAMPLES: Dict[str, str] = {
+_EXAMPLES: Dict[str, str] = {
     "Clinic note (basic)":
         "Pt with chronic kidney disease (CKD) and history of diabetes mellitus type 2. "
         "Complains of dyspnea; started on metformin 500 mg. Possible polycystic kidney disease.",
@@ -15,8 +16,14 @@ EXAMPLES: Dict[str, str] = {
         "Echo shows reduced LVEF 35%. Follow up with cardiology in 1–2 weeks.",
 }
 
-def example_names() -> List[str]:
-    return list(EXAMPLES.keys())
+# read-only view, so EXAMPLE_NAMES can't drift from the examples
+EXAMPLES: Mapping[str, str] = MappingProxyType(_EXAMPLES)
+
+# the selectbox asks for these on every rerun
+EXAMPLE_NAMES: Tuple[str, ...] = tuple(_EXAMPLES)
+
+def example_names() -> Tuple[str, ...]:
+    return EXAMPLE_NAMES
 
 def get_example(name: str) -> str:
-    return EXAMPLES.get(name, "")
+    return _EXAMPLES.get(name, "")
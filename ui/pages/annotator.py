@@ -1,47 +1,97 @@
 """Text annotation and NER interface page for SNOBot."""
 
+import codecs
+
 import pandas as pd
 import streamlit as st
 
-from models import Settings, FullCodedConcept
+from models import Settings
+from models.model_config import format_cost
 from ui.state import init_state, mark_stale, analyze_cb
-from ui.resolver import resolve_entities_api
-from ui.utils import csv_text, OMOP_DOMAINS, DOMAIN_COLORS
+from ui.resolver import resolve_entities_cached
+from ui.utils import csv_bytes, OMOP_DOMAINS, DOMAIN_COLORS
 from ui.components.annotated import render_annotated_component_from_concepts
-from ui.examples import example_names, get_example
+from ui.examples import EXAMPLE_NAMES, get_example
 
 # Text truncation settings
 MAX_TEXT_LENGTH = 4000
 
+# Entity rows shown until the user asks for the full table
+PREVIEW_ROWS = 50
+
 
 def _truncate_text_with_warning(text, source="input"):
     """Truncate text to MAX_TEXT_LENGTH and show toast warning if needed."""
-    if len(text) > MAX_TEXT_LENGTH:
-        truncated_text = text[:MAX_TEXT_LENGTH]
-        st.toast(f"⚠️ Text from {source} was truncated to {MAX_TEXT_LENGTH:,} characters (was {len(text):,} characters)", icon="⚠️")
-        return truncated_text
-    return text
+    length = len(text)
+    if length <= MAX_TEXT_LENGTH:
+        return text
+    st.toast(f"⚠️ Text from {source} was truncated to {MAX_TEXT_LENGTH:,} characters (was {length:,} characters)", icon="⚠️")
+    return text[:MAX_TEXT_LENGTH]
+
+
+# Extraction logs are final once analysis finishes, so their serializations are
+# cached by process_id (the leading underscore keeps Streamlit from hashing the log)
+@st.cache_data(show_spinner=False, max_entries=32)
+def _cached_markdown_report(process_id: str, _log) -> str:
+    return _log.to_markdown_report()
+
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def _cached_log_json(process_id: str, _log) -> str:
+    return _log.to_json()
+
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def _cached_log_dict(process_id: str, _log) -> dict:
+    return _log.to_dict()
+
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def _cached_csv_bytes(process_id: str, _concepts) -> bytes:
+    """CSV of an analysis' coded concepts, which are fixed per extraction process."""
+    return csv_bytes(_concepts)
 
 
-def _get_truncated_input_text():
-    """Get input text with truncation applied if needed."""
-    input_text = st.session_state.get("input_text", "")
-    if len(input_text) > MAX_TEXT_LENGTH:
-        truncated_text = input_text[:MAX_TEXT_LENGTH]
-        st.toast(f"⚠️ Input text was truncated to {MAX_TEXT_LENGTH:,} characters (was {len(input_text):,} characters)", icon="⚠️")
-        return truncated_text
-    return input_text
+def _metric_row(metrics):
+    """Lay (label, value) metrics out across a row of four columns."""
+    for col, (label, value) in zip(st.columns(4), metrics):
+        col.metric(label, value)
+
+
+def _log_summary(log_data) -> dict:
+    """Headline counts for the Process Log section."""
+    # One pass over the results for both flags
+    num_standard = num_negated = 0
+    for result in log_data.final_results:
+        if result.get('standard', False):
+            num_standard += 1
+        if result.get('negated', False):
+            num_negated += 1
+    return {
+        "total_duration": log_data.get_total_duration_ms(),
+        "num_mentions": len(log_data.mention_logs),
+        "num_concepts": len(log_data.final_results),
+        "num_standard": num_standard,
+        "num_negated": num_negated,
+    }
 
 
 def _handle_file_upload():
     """Handle file upload with truncation."""
     up = st.session_state.get("file_uploader")
     if up:
-        uploaded_text = up.read().decode("utf-8")
-        truncated_text = _truncate_text_with_warning(uploaded_text, "uploaded file")
-        # Store in a separate key to avoid widget modification issues
-        st.session_state.uploaded_text = truncated_text
-        st.session_state.use_uploaded_text = True
+        # Only MAX_TEXT_LENGTH characters are kept and UTF-8 needs at most 4 bytes per
+        # character, so never read or decode the rest of a large file
+        raw = up.read(MAX_TEXT_LENGTH * 4)
+        up.seek(0)
+        if up.size > len(raw):
+            # Decode incrementally so a character split at the cut is held back, not an error
+            truncated_text = codecs.getincrementaldecoder("utf-8")(errors="replace").decode(raw)[:MAX_TEXT_LENGTH]
+            st.toast(f"⚠️ Text from uploaded file was truncated to {MAX_TEXT_LENGTH:,} characters (was {up.size:,} bytes)", icon="⚠️")
+        else:
+            truncated_text = _truncate_text_with_warning(raw.decode("utf-8", errors="replace"), "uploaded file")
+        # on_change callbacks run before the widgets are built, so the text area's key can be set directly
+        st.session_state.input_text = truncated_text
         mark_stale()
 
 
@@ -66,18 +116,55 @@ def render_ner_ui():
     # ---------- Main: inputs ----------
     st.markdown("#### SNOBot: SNOMED-based Biomedical Named Entity Recognition and Resolution")
 
+    _render_input()
+
+    status_ph = st.empty()
+
+    # ---------- Compute only on Analyze ----------
+    if st.session_state.trigger_run and st.session_state.input_text.strip():
+        st.session_state.trigger_run = False
+        
+        # Typed text is capped by the text area and uploads are truncated (with a toast)
+        # on ingest, so this slice is only a guard
+        input_text = st.session_state.input_text[:MAX_TEXT_LENGTH]
+        
+        with status_ph.status("Processing…", expanded=False) as status_widget:
+            status_widget.update(label="Calling resolver…")
+            settings = Settings(backend=st.session_state.backend, domains=tuple(st.session_state.domains))
+            payload = resolve_entities_cached(input_text, settings.backend, settings.domains, status_widget)
+            st.session_state.entities_df = payload[1]
+            st.session_state.coded_concepts = payload[2]
+            st.session_state.extraction_logger = payload[3]  # Store the logger
+            st.session_state.results = {"payload": payload, "text": input_text, "settings": settings}
+            st.session_state.stale = False
+            
+            # Get cost information for status message
+            log_data = st.session_state.extraction_logger.log
+            # Summaries of the finished log, computed once here rather than on every rerun
+            usage_stats = st.session_state.usage_stats = log_data.get_usage_statistics()
+            st.session_state.log_summary = _log_summary(log_data)
+            if usage_stats['total_requests'] > 0:
+                cost_info = f" (Cost: {format_cost(usage_stats['total_cost'])})"
+            else:
+                cost_info = ""
+            
+            status_widget.update(label=f"Done ✅{cost_info}", state="complete")
+
+    # ---------- Display ----------
+    st.session_state._results_shown = bool(st.session_state.results)
+    if st.session_state.results:
+        _render_results()
+        _render_process_log()
+
+
+@st.fragment
+def _render_input():
+    """Input widgets; edits here rerun only this fragment, not the results below."""
     with st.expander("Input", expanded=True):
         col_in, col_actions = st.columns([3, 1])
         with col_in:
-            # Use uploaded text if available, otherwise use manual input
-            text_value = ""
-            if st.session_state.get("use_uploaded_text", False):
-                text_value = st.session_state.get("uploaded_text", "")
-                # Clear the flag after using it
-                st.session_state.use_uploaded_text = False
-            
             st.text_area("Paste text or upload a file", height=240, key="input_text", 
-                        value=text_value, on_change=mark_stale)
+                        max_chars=MAX_TEXT_LENGTH, on_change=mark_stale)
 
         with col_actions:
             up = st.file_uploader("Upload .txt/.md", type=["txt", "md", "csv", "tsv"], 
@@ -94,157 +181,127 @@ def render_ner_ui():
         with c1:
             st.selectbox(
                 label="Choose an example",
-                options=["— Load example —", *example_names()],
+                options=("— Load example —", *EXAMPLE_NAMES),
                 key="example_choice",
                 on_change=_on_example_change,
                 label_visibility="collapsed"
             )
         with c3:
-            st.button("Analyze", type="primary", use_container_width=True, on_click=analyze_cb)
+            clicked = st.button("Analyze", type="primary", use_container_width=True, on_click=analyze_cb)
 
-    status_ph = st.empty()
+    # Analysis (and clearing results on a new example) happens in the full script, not this fragment
+    if clicked or st.session_state.results is None and st.session_state.get("_results_shown"):
+        st.rerun()
 
-    # ---------- Compute only on Analyze ----------
-    if st.session_state.trigger_run and st.session_state.input_text.strip():
-        st.session_state.trigger_run = False
-        
-        # Get truncated input text (will show toast if truncation occurs)
-        input_text = _get_truncated_input_text()
-        
-        with status_ph.status("Processing…", expanded=False) as status_widget:
-            status_widget.update(label="Calling resolver…")
-            settings = Settings(backend=st.session_state.backend, domains=st.session_state.domains)
-            payload = resolve_entities_api(input_text, settings, status_widget)
-            st.session_state.entities_df = payload[1]
-            st.session_state.extraction_logger = payload[2]  # Store the logger
-            st.session_state.results = {"payload": payload, "text": input_text, "settings": settings}
-            st.session_state.stale = False
-            
-            # Get cost information for status message
-            log_data = st.session_state.extraction_logger.log
-            usage_stats = log_data.get_usage_statistics()
+
+def _display_dataframe_window(df: pd.DataFrame, max_rows: int = PREVIEW_ROWS):
+    """Render at most max_rows of df, with a slider choosing the window for longer tables."""
+    if len(df) <= max_rows:
+        st.dataframe(df, use_container_width=True, hide_index=True)
+        return
+    start = st.slider("Start row", 0, len(df) - max_rows, 0, key="entities_start_row")
+    st.caption(f"Rows {start + 1:,}–{start + max_rows:,} of {len(df):,}")
+    st.dataframe(df.iloc[start:start + max_rows], use_container_width=True, hide_index=True)
+
+
+@st.fragment
+def _render_results():
+    """Annotated text, entity table and CSV download.
+
+    A fragment, so interacting with these widgets reruns only this section.
+    """
+    if not st.session_state.get("results"):
+        return
+
+    with st.expander("Results", expanded=True):
+        render_annotated_component_from_concepts(
+            st.session_state.results["text"],
+            st.session_state.coded_concepts
+        )
+
+        df = st.session_state.entities_df
+        if df.empty:
+            st.info("No entities detected.")
+        else:
+            _display_dataframe_window(df)
+
+        st.download_button(
+            "Download CSV",
+            _cached_csv_bytes(st.session_state.extraction_logger.log.process_id, st.session_state.coded_concepts),
+            "entities.csv",
+            "text/csv",
+            use_container_width=False
+        )
+
+
+@st.fragment
+def _render_process_log():
+    """Process log metrics, report and downloads, rerun independently of the page."""
+    if hasattr(st.session_state, 'extraction_logger') and st.session_state.extraction_logger:
+        extraction_logger = st.session_state.extraction_logger
+        log_data = extraction_logger.get_log()
+        markdown_report = _cached_markdown_report(log_data.process_id, log_data)
+        summary = st.session_state.log_summary
+
+        with st.expander("Process Log", expanded=False):
+            # Summary stats
+            total_duration = summary["total_duration"]
+            if total_duration:
+                duration_str = f"{total_duration/1000:.2f}s" if total_duration >= 1000 else f"{total_duration:.0f}ms"
+                st.metric("Total Processing Time", duration_str)
+
+            _metric_row((
+                ("Mentions Identified", summary["num_mentions"]),
+                ("Concepts Coded", summary["num_concepts"]),
+                ("Standard Concepts", summary["num_standard"]),
+                ("Negated Concepts", summary["num_negated"]),
+            ))
+
+            # Add usage metrics
+            usage_stats = st.session_state.usage_stats
             if usage_stats['total_requests'] > 0:
-                from models.model_config import format_cost
-                cost_info = f" (Cost: {format_cost(usage_stats['total_cost'])})"
-            else:
-                cost_info = ""
-            
-            status_widget.update(label=f"Done ✅{cost_info}", state="complete")
+                st.subheader("Token Usage & Cost")
+                _metric_row((
+                    ("API Requests", usage_stats['total_requests']),
+                    ("Total Tokens", f"{usage_stats['total_tokens']:,}"),
+                    ("Total Cost", format_cost(usage_stats['total_cost'])),
+                    ("Avg Cost/Request", format_cost(usage_stats['avg_cost_per_request'])),
+                ))
 
-    # ---------- Display ----------
-    if st.session_state.results:
-        with st.expander("Results", expanded=True):
-            # Convert DataFrame back to FullCodedConcept objects
-            coded_concepts = []
-            if not st.session_state.entities_df.empty:
-                for _, row in st.session_state.entities_df.iterrows():
-                    coded_concepts.append(FullCodedConcept(
-                        mention_str=row.get('mention_str', ''),
-                        concept_id=str(row.get('concept_id', '')),
-                        concept_name=row.get('concept_name', ''),
-                        domain_id=row.get('domain_id', 'Other'),
-                        vocabulary_id=row.get('vocabulary_id', ''),
-                        concept_code=row.get('concept_code', ''),
-                        standard=row.get('standard', False),
-                        negated=row.get('negated', False)
-                    ))
-            
-            render_annotated_component_from_concepts(
-                st.session_state.results["text"],
-                coded_concepts
-            )
+                # Second row with more details
+                detail_metrics = [
+                    ("Request Tokens", f"{usage_stats['total_request_tokens']:,}"),
+                    ("Response Tokens", f"{usage_stats['total_response_tokens']:,}"),
+                    ("Avg Tokens/Request", f"{usage_stats['avg_tokens_per_request']:.1f}"),
+                ]
+                if usage_stats['models_used']:
+                    detail_metrics.append(("Models Used", ', '.join(usage_stats['models_used'])))
+                _metric_row(detail_metrics)
 
-            df = st.session_state.entities_df
-            st.dataframe(df if not df.empty else df, use_container_width=True, hide_index=True)
+            # Markdown Report
+            with st.expander("Detailed Report", expanded=False):
+                st.markdown(markdown_report)
 
-            st.download_button(
-                "Download CSV",
-                csv_text(df),
-                "entities.csv",
-                "text/csv",
-                use_container_width=False
-            )
-        
-        # Process Log Section
-        if hasattr(st.session_state, 'extraction_logger') and st.session_state.extraction_logger:
-            extraction_logger = st.session_state.extraction_logger
-            log_data = extraction_logger.get_log()
-            
-            with st.expander("Process Log", expanded=False):
-                # Summary stats
-                total_duration = log_data.get_total_duration_ms()
-                if total_duration:
-                    duration_str = f"{total_duration/1000:.2f}s" if total_duration >= 1000 else f"{total_duration:.0f}ms"
-                    st.metric("Total Processing Time", duration_str)
-                
-                col1, col2, col3, col4 = st.columns(4)
-                with col1:
-                    st.metric("Mentions Identified", len(log_data.mention_logs))
-                with col2:
-                    st.metric("Concepts Coded", len(log_data.final_results))
-                with col3:
-                    num_standard = sum(1 for result in log_data.final_results if result.get('standard', False))
-                    st.metric("Standard Concepts", num_standard)
-                with col4:
-                    num_negated = sum(1 for result in log_data.final_results if result.get('negated', False))
-                    st.metric("Negated Concepts", num_negated)
-                
-                # Add usage metrics
-                usage_stats = log_data.get_usage_statistics()
-                if usage_stats['total_requests'] > 0:
-                    from models.model_config import format_cost
-                    
-                    st.subheader("Token Usage & Cost")
-                    col1, col2, col3, col4 = st.columns(4)
-                    with col1:
-                        st.metric("API Requests", usage_stats['total_requests'])
-                    with col2:
-                        st.metric("Total Tokens", f"{usage_stats['total_tokens']:,}")
-                    with col3:
-                        cost_formatted = format_cost(usage_stats['total_cost'])
-                        st.metric("Total Cost", cost_formatted)
-                    with col4:
-                        avg_cost = format_cost(usage_stats['avg_cost_per_request'])
-                        st.metric("Avg Cost/Request", avg_cost)
-                    
-                    # Second row with more details
-                    col1, col2, col3, col4 = st.columns(4)
-                    with col1:
-                        st.metric("Request Tokens", f"{usage_stats['total_request_tokens']:,}")
-                    with col2:
-                        st.metric("Response Tokens", f"{usage_stats['total_response_tokens']:,}")
-                    with col3:
-                        st.metric("Avg Tokens/Request", f"{usage_stats['avg_tokens_per_request']:.1f}")
-                    with col4:
-                        if usage_stats['models_used']:
-                            models_text = ', '.join(usage_stats['models_used'])
-                            st.metric("Models Used", models_text)
-                
-                # Markdown Report
-                with st.expander("Detailed Report", expanded=False):
-                    markdown_report = log_data.to_markdown_report()
-                    st.markdown(markdown_report)
-                
-                # Raw log data
-                with st.expander("Raw Log Data", expanded=False):
-                    st.json(log_data.to_dict())
-                
-                # Download buttons below expanders
-                st.subheader("Downloads")
-                col1, col2 = st.columns(2)
-                with col1:
-                    st.download_button(
-                        "Download Report (.md)",
-                        log_data.to_markdown_report(),
-                        f"extraction_report_{log_data.process_id}.md",
-                        "text/markdown",
-                        use_container_width=True
-                    )
-                with col2:
-                    st.download_button(
-                        "Download Raw Log (.json)",
-                        log_data.to_json(),
-                        f"extraction_log_{log_data.process_id}.json",
-                        "application/json",
-                        use_container_width=True
-                    )
+            # Raw log data
+            with st.expander("Raw Log Data", expanded=False):
+                st.json(_cached_log_dict(log_data.process_id, log_data))
+
+            # Download buttons below expanders
+            st.subheader("Downloads")
+            col1, col2 = st.columns(2)
+            with col1:
+                st.download_button(
+                    "Download Report (.md)",
+                    markdown_report,
+                    f"extraction_report_{log_data.process_id}.md",
+                    "text/markdown",
+                    use_container_width=True
+                )
+            with col2:
+                st.download_button(
+                    "Download Raw Log (.json)",
+                    _cached_log_json(log_data.process_id, log_data),
+                    f"extraction_log_{log_data.process_id}.json",
+                    "application/json",
+                    use_container_width=True
+                )
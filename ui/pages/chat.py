@@ -8,10 +8,9 @@ from agents.chat_agent import agent
 import load_env_secure
 
 
-def render_chat_app():
-    """Render the chat application interface."""
-    st.set_page_config(layout="centered")
-    
+@st.cache_resource
+def _get_configs():
+    """App and agent configuration, built once per process and shared by every session."""
     app_config = AppConfig()
 
     agent_configs = {
@@ -21,4 +20,11 @@ def render_chat_app():
             rendering_functions=[]
         )
     }
-    serve(app_config, agent_configs)
+    return app_config, agent_configs
+
+
+def render_chat_app():
+    """Render the chat application interface."""
+    st.set_page_config(layout="centered")
+    
+    serve(*_get_configs())
@@ -1,18 +1,66 @@
-# Stub resolver — replace with your backend call
-from typing import Dict, Any, Tuple
+"""Entity resolution for the UI, backed by the extraction agent."""
+from pathlib import Path
+from typing import Dict, Any, List, Tuple
 from models import Settings, FullCodedConcept, ExtractionLogger
+import logging
+import pickle
+import threading
 import time
+import streamlit as st
+from streamlit.runtime.caching.cache_errors import CacheError
 from agents.extract_agent import extract_and_code_mentions
 import pandas as pd
+from ui.utils import CONCEPT_FIELDS
 
-def resolve_entities_api(text: str, settings: Settings, status_widget) -> Tuple[Dict[str, Any], pd.DataFrame, ExtractionLogger]:
-    """Resolve entities using the enhanced agent and return DataFrame for UI compatibility."""
+logger = logging.getLogger(__name__)
+
+# Part of the persisted resolver cache key: bump whenever the shape of the cached result
+# changes (resolve_entities_api's return value, ExtractionLogger, LogStep, FullCodedConcept,
+# CONCEPT_DTYPES), so entries pickled by an older deploy miss instead of being served
+RESOLVER_CACHE_VERSION = 1
+
+# Persisted results contain the analyzed clinical text; keep them for a week at most
+RESOLVER_CACHE_MAX_AGE_S = 7 * 24 * 60 * 60
+RESOLVER_CACHE_PRUNE_INTERVAL_S = 60 * 60
+# Where st.cache_data(persist="disk") writes its entries (~/.streamlit/cache/*.memo)
+STREAMLIT_CACHE_DIR = Path.home() / ".streamlit" / "cache"
+
+# What loading a pickle from an older deploy can raise: missing or renamed modules and
+# classes, or slotted dataclasses whose fields no longer match
+_UNPICKLE_ERRORS = (pickle.UnpicklingError, AttributeError, ImportError, TypeError, ValueError, EOFError)
+
+_prune_lock = threading.Lock()
+_last_prune = None
+
+# Arrow-backed strings and dictionary-encoded low-cardinality columns, so st.dataframe
+# ships the table to the browser without re-inferring object columns
+CONCEPT_DTYPES = {
+    "mention_str": "string[pyarrow]",
+    "concept_id": "string[pyarrow]",
+    "concept_name": "string[pyarrow]",
+    "domain_id": "category",
+    "vocabulary_id": "category",
+    "concept_code": "string[pyarrow]",
+    "standard": "bool",
+    "negated": "bool",
+}
+
+def resolve_entities_api(text: str, settings: Settings, status_widget) -> Tuple[Dict[str, Any], pd.DataFrame, List[FullCodedConcept], ExtractionLogger]:
+    """Resolve entities using the enhanced agent.
+
+    Returns the concepts both as a DataFrame (for the table and CSV download) and as
+    the original FullCodedConcept list (for the annotated text), so the UI never has
+    to rebuild one from the other.
+    """
 
     coded_concepts, extraction_logger = extract_and_code_mentions(text, status_widget)
     
-    # Convert FullCodedConcept objects to dictionaries for DataFrame creation
-    concept_dicts = [concept.to_dict() for concept in coded_concepts]
-    df = pd.DataFrame(concept_dicts)
+    # Plain row tuples in a fixed column order, so pandas needs no per-row key lookups
+    df = pd.DataFrame.from_records(
+        [(c.mention_str, str(c.concept_id), c.concept_name, c.domain_id,
+          c.vocabulary_id, c.concept_code, c.standard, c.negated) for c in coded_concepts],
+        columns=CONCEPT_FIELDS,
+    ).astype(CONCEPT_DTYPES)
 
     meta = {
         "backend": settings.backend,
@@ -20,4 +68,70 @@ def resolve_entities_api(text: str, settings: Settings, status_widget) -> Tuple[
         "chars": len(text)
     }
 
-    return (meta, df, extraction_logger)
\ No newline at end of file
+    return (meta, df, coded_concepts, extraction_logger)
+
+
+@st.cache_data(show_spinner=False, persist="disk", max_entries=1024)
+def _resolve_entities_persisted(text: str, backend: str, domains: Tuple[str, ...], cache_version: int, _status_widget) -> bytes:
+    """resolve_entities_api on a cache miss, stored as a pickle that resolve_entities_cached loads.
+
+    Streamlit only recovers from an UnpicklingError when it reads a disk entry. Returning
+    bytes means its own load always succeeds, and the real unpickle, which fails with
+    AttributeError/TypeError when the logged classes change shape, happens in our code.
+    """
+    result = resolve_entities_api(text, Settings(backend=backend, domains=domains), _status_widget)
+    return pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def resolve_entities_cached(text: str, backend: str, domains: Tuple[str, ...], status_widget) -> Tuple[Dict[str, Any], pd.DataFrame, List[FullCodedConcept], ExtractionLogger]:
+    """resolve_entities_api memoized on (text, backend, domains), so re-analyzing unchanged input skips the LLM calls.
+
+    Results are persisted to disk, so they survive server restarts, and each caller gets
+    its own unpickled copy. The status widget is only updated on a miss. Entries written
+    under another RESOLVER_CACHE_VERSION miss, and an entry that can no longer be read
+    is dropped and recomputed rather than surfaced as an error.
+    """
+    _prune_resolver_cache()
+    args = (text, backend, tuple(domains), RESOLVER_CACHE_VERSION, status_widget)
+    # Errors from the resolver itself propagate from here; only a stored entry that
+    # Streamlit itself can't read (CacheError) or that we can't unpickle is recomputed
+    try:
+        blob = _resolve_entities_persisted(*args)
+    except CacheError as e:
+        logger.warning(f"Discarding unreadable resolver cache entry: {e!r}")
+        _resolve_entities_persisted.clear(*args)
+        blob = _resolve_entities_persisted(*args)
+    try:
+        return pickle.loads(blob)
+    except _UNPICKLE_ERRORS as e:
+        logger.warning(f"Discarding unreadable resolver cache entry: {e!r}")
+    _resolve_entities_persisted.clear(*args)
+    return pickle.loads(_resolve_entities_persisted(*args))
+
+
+def _prune_resolver_cache() -> None:
+    """Delete persisted resolver results older than RESOLVER_CACHE_MAX_AGE_S.
+
+    The entries hold the analyzed note text, and Streamlit ignores ttl for disk caches, so
+    retention is enforced here by file age, at most once per RESOLVER_CACHE_PRUNE_INTERVAL_S.
+    The resolver is the app's only persist="disk" cache, so every entry in the folder is ours.
+    A pruned entry can still be served from this process's in-memory copy (bounded by
+    max_entries) until the server restarts, but it is never read back from disk.
+    """
+    global _last_prune
+    now = time.monotonic()
+    with _prune_lock:
+        if _last_prune is not None and now - _last_prune < RESOLVER_CACHE_PRUNE_INTERVAL_S:
+            return
+        _last_prune = now
+    cutoff = time.time() - RESOLVER_CACHE_MAX_AGE_S
+    try:
+        entries = list(STREAMLIT_CACHE_DIR.glob("*.memo"))
+    except OSError:
+        return
+    for path in entries:
+        try:
+            if path.stat().st_mtime < cutoff:
+                path.unlink()
+        except OSError as e:
+            logger.warning(f"Could not prune resolver cache entry {path.name}: {e}")
@@ -5,11 +5,18 @@ def init_state():
     ss.setdefault("input_text", "")
     ss.setdefault("results", None)       # {"payload":..., "text": str, "settings": Settings}
     ss.setdefault("entities_df", None)   # latest computed DF (source of truth)
+    ss.setdefault("coded_concepts", [])  # resolver FullCodedConcept list behind entities_df
+    ss.setdefault("usage_stats", None)   # extraction log usage statistics, computed on Analyze
+    ss.setdefault("log_summary", None)   # extraction log headline counts, computed on Analyze
     ss.setdefault("stale", False)        # mark current results stale on any input change
     ss.setdefault("trigger_run", False)  # compute only when Analyze sets this True
 
 def mark_stale():
-    st.session_state.stale = True
+    # Only a real change to the input text invalidates the current results
+    h = hash(st.session_state.get("input_text", ""))
+    if st.session_state.get("_input_hash") != h:
+        st.session_state._input_hash = h
+        st.session_state.stale = True
 
 def load_example_cb():
     st.session_state.input_text = (
@@ -1,7 +1,11 @@
+import csv
 import io
+from dataclasses import fields
 from typing import Dict, Any, List, Literal
 import pandas as pd
 
+from models import FullCodedConcept
+
 
 OMOP_DOMAINS = [
     "Condition",
@@ -49,7 +53,14 @@ DOMAIN_COLORS = {
 #         })
 #     return df
 
-def csv_text(df: pd.DataFrame) -> str:
+# Column order shared by the entities table and the CSV download
+CONCEPT_FIELDS = tuple(f.name for f in fields(FullCodedConcept))
+
+
+def csv_bytes(concepts: List[FullCodedConcept]) -> bytes:
+    """UTF-8 CSV of the coded concepts, written straight from the dataclasses without a DataFrame."""
     buf = io.StringIO()
-    df.to_csv(buf, index=False)
-    return buf.getvalue()
+    writer = csv.writer(buf, lineterminator="\n")
+    writer.writerow(CONCEPT_FIELDS)
+    writer.writerows([getattr(c, f) for f in CONCEPT_FIELDS] for c in concepts)
+    return buf.getvalue().encode("utf-8")
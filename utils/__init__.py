@@ -1,7 +1,8 @@
 # Utils module for SNOBot
-from .report_generator import generate_markdown_report, generate_summary_stats
+from .report_generator import generate_markdown_report, generate_summary_stats, write_markdown_report
 
 __all__ = [
     "generate_markdown_report",
     "generate_summary_stats",
+    "write_markdown_report",
 ]
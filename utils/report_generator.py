@@ -1,13 +1,78 @@
 """Generate markdown reports from extraction logs."""
 
-from typing import Dict, Any
-from models.extraction_log import ExtractionProcessLog, LogStep, MentionCodingLog
+from collections import Counter
+from itertools import islice
+from typing import Dict, Any, TextIO
+from models.extraction_log import ExtractionProcessLog, MentionCodingLog
+from models.model_config import format_cost
+
+
+# Static report skeleton, built once at import; per-report values are filled in with
+# str.format. Each template is a run of report lines, a trailing "\n" standing in for
+# the blank separator line that follows a section.
+_HEADER_TEMPLATE = (
+    "# Extraction Process Report{duration}\n"
+    "**Process ID**: `{process_id}`\n"
+    "**Start Time**: {start_time}\n"
+    "**End Time**: {end_time}\n"
+    "**Text Length**: {text_length} characters\n"
+)
+_INPUT_TEXT_HEADER = "## Input Text\n"
+_SUMMARY_TEMPLATE = (
+    "## Process Summary\n"
+    "- **Mentions identified**: {num_mentions}\n"
+    "- **Concepts coded**: {num_results}\n"
+    "- **Standard concepts found**: {num_standard}\n"
+    "- **Negated concepts**: {num_negated}\n"
+    "- **Total processing time**: {total_time}\n"
+)
+_USAGE_TEMPLATE = (
+    "## Token Usage & Cost Statistics\n"
+    "- **Total API Requests**: {total_requests}\n"
+    "- **Request Tokens**: {total_request_tokens:,}\n"
+    "- **Response Tokens**: {total_response_tokens:,}\n"
+    "- **Total Tokens**: {total_tokens:,}\n"
+    "- **Total Cost**: {total_cost}\n"
+    "- **Average Tokens per Request**: {avg_tokens_per_request:.1f}\n"
+    "- **Average Cost per Request**: {avg_cost_per_request}\n"
+)
+_MODELS_USED_TEMPLATE = "- **Models Used**: {models}\n"
+_TOKEN_BREAKDOWN_TEMPLATE = (
+    "### Detailed Token Breakdown\n"
+    "- **Cached Tokens**: {cached_tokens:,}\n"
+    "- **Reasoning Tokens**: {reasoning_tokens:,}\n"
+    "- **Accepted Prediction Tokens**: {accepted_prediction_tokens:,}\n"
+    "- **Rejected Prediction Tokens**: {rejected_prediction_tokens:,}\n"
+    "- **Audio Tokens**: {audio_tokens:,}\n"
+)
+# Standard/negated suffix of a mention's final result line, keyed by (standard, negated)
+_RESULT_MARKERS = {
+    (True, True): " [STANDARD] (negated)",
+    (True, False): " [STANDARD]",
+    (False, True): " [NON-STANDARD] (negated)",
+    (False, False): " [NON-STANDARD]",
+}
+# Step types whose input and output are rendered as a search query and its results
+_SEARCH_STEP_TYPES = frozenset({'initial_vector_search', 'vector_search', 'string_search', 'alternative_vector_search'})
+_PROCESS_OVERVIEW_HEADER = "## Process Overview\n"
+_MENTION_CODING_HEADER = "## Detailed Mention Coding Process\n"
+_FINAL_RESULTS_HEADER = "## Final Results Summary\n"
+_FINAL_RESULT_TEMPLATE = (
+    "{index}. **'{mention}'** → {concept_name}\n"
+    "   - **Concept ID**: {concept_id}\n"
+    "   - **Domain**: {domain}\n"
+    "   - **Vocabulary**: {vocabulary}\n"
+    "   - **Concept Code**: {concept_code}\n"
+    "   - **Standard Status**: {standard_status}{negated}\n"
+)
+_NEGATED_LINE = "\n   - **Negated**: Yes"
 
 
 def _format_duration(duration_ms: float) -> str:
     """Format duration in a human-readable way."""
     if duration_ms < 1000:
-        return f"{duration_ms:.0f}ms"
+        # round() matches the ".0f" format (half-to-even) but skips float formatting
+        return f"{round(duration_ms)}ms"
     elif duration_ms < 60000:
         return f"{duration_ms/1000:.2f}s"
     else:
@@ -39,220 +104,243 @@ def _format_step_data(data: Dict[str, Any], max_length: int = 200) -> str:
     return result
 
 
-def _format_concept_list(concepts: list, max_display: int = 20) -> str:
-    """Format a list of concepts for detailed display."""
-    if not concepts:
-        return "None found"
-    
-    lines = []
-    for i, concept in enumerate(concepts[:max_display]):
+def _format_usage_line(usage: Dict[str, Any]) -> str:
+    """Format a step's usage statistics as a token usage bullet."""
+    return f"- Token Usage: {usage.get('total_tokens', 0)} tokens ({usage.get('request_tokens', 0)} request + {usage.get('response_tokens', 0)} response)"
+
+
+def _write_concept_list(out: list, concepts: list, indent: str = "", max_display: int = 20) -> None:
+    """Write a list of concepts for detailed display, one line each."""
+    for i, concept in enumerate(islice(concepts, max_display)):
         if isinstance(concept, dict):
             concept_id = concept.get('concept_id', 'Unknown')
             concept_name = concept.get('concept_name', 'Unknown')
             domain = concept.get('domain_id', 'Unknown')
             standard = concept.get('standard', False)
             standard_marker = " [STANDARD]" if standard else " [NON-STANDARD]"
-            lines.append(f"  {i+1}. {concept_name} (ID: {concept_id}, Domain: {domain}){standard_marker}")
+            out.append(f"{indent}  {i+1}. {concept_name} (ID: {concept_id}, Domain: {domain}){standard_marker}")
         else:
-            lines.append(f"  {i+1}. {concept}")
+            out.append(f"{indent}  {i+1}. {concept}")
     
     if len(concepts) > max_display:
-        lines.append(f"  ... and {len(concepts) - max_display} more concepts")
-    
-    return "\n".join(lines)
+        out.append(f"{indent}  ... and {len(concepts) - max_display} more concepts")
 
 
-def _format_search_results(output_data: Dict[str, Any]) -> str:
-    """Format search results with detailed concept information."""
-    if not output_data:
-        return "No data available"
-    
-    lines = []
+def _write_search_results(out: list, output_data: Dict[str, Any]) -> None:
+    """Write search results with detailed concept information."""
+    written = len(out)
     
     # Add basic search info
     if 'search_query' in output_data:
-        lines.append(f"**Search Query**: {output_data['search_query']}")
+        out.append(f"- **Search Query**: {output_data['search_query']}")
     if 'total_count' in output_data:
-        lines.append(f"**Results Found**: {output_data['total_count']}")
+        out.append(f"- **Results Found**: {output_data['total_count']}")
     
     # Add concept details if available
     if 'concepts' in output_data and output_data['concepts']:
-        lines.append("**Concept Candidates**:")
-        lines.append(_format_concept_list(output_data['concepts']))
+        out.append("- **Concept Candidates**:")
+        _write_concept_list(out, output_data['concepts'])
     elif 'concept_ids' in output_data:
-        lines.append(f"**Concept IDs Retrieved**: {', '.join(map(str, output_data['concept_ids']))}")
+        out.append(f"- **Concept IDs Retrieved**: {', '.join(map(str, output_data['concept_ids']))}")
     
-    return "\n".join(lines) if lines else "No detailed results available"
+    if len(out) == written:
+        out.append("No detailed results available")
 
 
-def _generate_detailed_step_info(step: LogStep) -> str:
-    """Generate detailed information for a step."""
-    lines = []
-    
-    # Input data
-    if step.input_data:
-        lines.append("\n**Input Data:**")
-        if step.step_type in ['initial_vector_search', 'vector_search', 'string_search', 'alternative_vector_search']:
-            if 'query' in step.input_data:
-                lines.append(f"- Query: '{step.input_data['query']}'")
-            if 'alternative_query' in step.input_data:
-                lines.append(f"- Alternative Query: '{step.input_data['alternative_query']}'")
-            if 'max_results' in step.input_data:
-                lines.append(f"- Max Results: {step.input_data['max_results']}")
-            if 'original_mention' in step.input_data:
-                lines.append(f"- Original Mention: '{step.input_data['original_mention']}'")
-        elif step.step_type == 'concept_context':
-            if 'concept_ids' in step.input_data:
-                concept_ids = step.input_data['concept_ids']
-                lines.append(f"- Concept IDs: {', '.join(map(str, concept_ids))}")
-        elif step.step_type == 'agent_reasoning':
-            if 'num_candidates' in step.input_data:
-                lines.append(f"- Candidate Concepts: {step.input_data['num_candidates']}")
-            if 'context_length' in step.input_data:
-                lines.append(f"- Context Length: {step.input_data['context_length']} characters")
-            if 'model' in step.input_data:
-                lines.append(f"- Model: {step.input_data['model']}")
+def _write_search_input(out: list, data: Dict[str, Any]) -> None:
+    if 'query' in data:
+        out.append(f"- Query: '{data['query']}'")
+    if 'alternative_query' in data:
+        out.append(f"- Alternative Query: '{data['alternative_query']}'")
+    if 'max_results' in data:
+        out.append(f"- Max Results: {data['max_results']}")
+    if 'original_mention' in data:
+        out.append(f"- Original Mention: '{data['original_mention']}'")
+
+
+def _write_concept_context_input(out: list, data: Dict[str, Any]) -> None:
+    if 'concept_ids' in data:
+        concept_ids = data['concept_ids']
+        out.append(f"- Concept IDs: {', '.join(map(str, concept_ids))}")
+
+
+def _write_agent_reasoning_input(out: list, data: Dict[str, Any]) -> None:
+    if 'num_candidates' in data:
+        out.append(f"- Candidate Concepts: {data['num_candidates']}")
+    if 'context_length' in data:
+        out.append(f"- Context Length: {data['context_length']} characters")
+    if 'model' in data:
+        out.append(f"- Model: {data['model']}")
+
+
+def _write_generic_input(out: list, data: Dict[str, Any]) -> None:
+    for key, value in data.items():
+        if isinstance(value, (list, dict)) and len(str(value)) > 100:
+            out.append(f"- {key}: [Complex data structure with {len(value) if hasattr(value, '__len__') else 'multiple'} items]")
         else:
-            # Generic formatting for other step types
-            for key, value in step.input_data.items():
-                if isinstance(value, (list, dict)) and len(str(value)) > 100:
-                    lines.append(f"- {key}: [Complex data structure with {len(value) if hasattr(value, '__len__') else 'multiple'} items]")
-                else:
-                    lines.append(f"- {key}: {value}")
-    
-    # Output data with special formatting
-    if step.output_data:
-        lines.append("\n**Output Data:**")
-        if step.step_type in ['initial_vector_search', 'vector_search', 'string_search', 'alternative_vector_search']:
-            search_result = _format_search_results(step.output_data)
-            # Add proper indentation for search results
-            for line in search_result.split('\n'):
-                if line.strip():
-                    if line.startswith('**'):
-                        lines.append(f"- {line}")
-                    else:
-                        lines.append(line)
-        elif step.step_type == 'agent_reasoning':
-            if 'selected_concept_id' in step.output_data:
-                lines.append(f"- Selected Concept: {step.output_data.get('selected_concept_name', 'Unknown')} (ID: {step.output_data['selected_concept_id']})")
-            if 'negated' in step.output_data:
-                lines.append(f"- Negated: {step.output_data['negated']}")
-            # Add usage stats for agent reasoning
-            if 'usage_stats' in step.output_data:
-                usage = step.output_data['usage_stats']
-                lines.append(f"- Token Usage: {usage.get('total_tokens', 0)} tokens ({usage.get('request_tokens', 0)} request + {usage.get('response_tokens', 0)} response)")
-        elif step.step_type == 'concept_mapping':
-            if 'mapping_found' in step.output_data:
-                lines.append(f"- Standard Mapping Found: {step.output_data['mapping_found']}")
-            if 'original_concept_id' in step.output_data and 'final_concept_id' in step.output_data:
-                orig = step.output_data['original_concept_id']
-                final = step.output_data['final_concept_id']
-                if orig != final:
-                    lines.append(f"- Mapped from {orig} to {final}")
-                else:
-                    lines.append(f"- Used original concept {orig} (no mapping available)")
-        elif step.step_type == 'final_concept_retrieval':
-            if 'concept_name' in step.output_data:
-                lines.append(f"- Final Concept: {step.output_data.get('concept_name')} (ID: {step.output_data.get('concept_id')})")
-            if 'domain_id' in step.output_data:
-                lines.append(f"- Domain: {step.output_data.get('domain_id')}")
-            if 'standard' in step.output_data:
-                standard_status = "STANDARD" if step.output_data['standard'] else "NON-STANDARD"
-                lines.append(f"- Standard Status: {standard_status}")
+            out.append(f"- {key}: {value}")
+
+
+def _write_agent_reasoning_output(out: list, data: Dict[str, Any]) -> None:
+    if 'selected_concept_id' in data:
+        out.append(f"- Selected Concept: {data.get('selected_concept_name', 'Unknown')} (ID: {data['selected_concept_id']})")
+    if 'negated' in data:
+        out.append(f"- Negated: {data['negated']}")
+    # Add usage stats for agent reasoning
+    if 'usage_stats' in data:
+        out.append(_format_usage_line(data['usage_stats']))
+
+
+def _write_concept_mapping_output(out: list, data: Dict[str, Any]) -> None:
+    if 'mapping_found' in data:
+        out.append(f"- Standard Mapping Found: {data['mapping_found']}")
+    if 'original_concept_id' in data and 'final_concept_id' in data:
+        orig = data['original_concept_id']
+        final = data['final_concept_id']
+        if orig != final:
+            out.append(f"- Mapped from {orig} to {final}")
         else:
-            # Generic output formatting
-            for key, value in step.output_data.items():
-                if key == 'usage_stats' and isinstance(value, dict):
-                    # Format usage statistics nicely
-                    lines.append(f"- Token Usage: {value.get('total_tokens', 0)} tokens ({value.get('request_tokens', 0)} request + {value.get('response_tokens', 0)} response)")
-                elif isinstance(value, list) and len(value) > 0:
-                    if isinstance(value[0], dict) and 'concept_name' in value[0]:
-                        # This looks like a concept list
-                        lines.append(f"- {key}:")
-                        concept_list = _format_concept_list(value)
-                        for line in concept_list.split('\n'):
-                            if line.strip():
-                                lines.append(f"  {line}")  # Add extra indentation for concept lists
-                    elif len(str(value)) > 100:
-                        lines.append(f"- {key}: [List with {len(value)} items]")
-                    else:
-                        lines.append(f"- {key}: {value}")
-                elif isinstance(value, dict) and len(str(value)) > 100:
-                    lines.append(f"- {key}: [Complex data structure]")
-                else:
-                    lines.append(f"- {key}: {value}")
-    
-    return "\n".join(lines) if lines else ""
+            out.append(f"- Used original concept {orig} (no mapping available)")
+
+
+def _write_final_retrieval_output(out: list, data: Dict[str, Any]) -> None:
+    if 'concept_name' in data:
+        out.append(f"- Final Concept: {data.get('concept_name')} (ID: {data.get('concept_id')})")
+    if 'domain_id' in data:
+        out.append(f"- Domain: {data.get('domain_id')}")
+    if 'standard' in data:
+        standard_status = "STANDARD" if data['standard'] else "NON-STANDARD"
+        out.append(f"- Standard Status: {standard_status}")
+
 
+def _write_generic_output(out: list, data: Dict[str, Any]) -> None:
+    for key, value in data.items():
+        if key == 'usage_stats' and isinstance(value, dict):
+            out.append(_format_usage_line(value))
+        elif isinstance(value, list) and len(value) > 0:
+            if isinstance(value[0], dict) and 'concept_name' in value[0]:
+                # This looks like a concept list, indented one level further
+                out.append(f"- {key}:")
+                _write_concept_list(out, value, indent="  ")
+            elif len(str(value)) > 100:
+                out.append(f"- {key}: [List with {len(value)} items]")
+            else:
+                out.append(f"- {key}: {value}")
+        elif isinstance(value, dict) and len(str(value)) > 100:
+            out.append(f"- {key}: [Complex data structure]")
+        else:
+            out.append(f"- {key}: {value}")
+
+
+# Per-step-type writers for a step's input and output data; other types use the generic ones
+_INPUT_WRITERS = {
+    **dict.fromkeys(_SEARCH_STEP_TYPES, _write_search_input),
+    'concept_context': _write_concept_context_input,
+    'agent_reasoning': _write_agent_reasoning_input,
+}
+_OUTPUT_WRITERS = {
+    **dict.fromkeys(_SEARCH_STEP_TYPES, _write_search_results),
+    'agent_reasoning': _write_agent_reasoning_output,
+    'concept_mapping': _write_concept_mapping_output,
+    'final_concept_retrieval': _write_final_retrieval_output,
+}
 
-def _generate_step_summary(step: LogStep) -> str:
-    """Generate a summary line for a step."""
-    duration_str = f" ({_format_duration(step.duration_ms)})" if step.duration_ms else ""
-    error_str = f" ERROR: {step.error}" if step.error else ""
-    return f"- **{step.step_type}**: {step.description}{duration_str}{error_str}"
+
+def _write_steps(out: list, steps: list, heading: str) -> float:
+    """Write each step in one pass: numbered heading, summary line, then input and output details.
+
+    Returns the steps' total duration in milliseconds, summed along the way.
+    """
+    total_duration = 0
+    for i, step in enumerate(steps, 1):
+        step_type = step.step_type
+        duration_str = ""
+        if step.duration_ms:
+            total_duration += step.duration_ms
+            duration_str = f" ({_format_duration(step.duration_ms)})"
+        error_str = f" ERROR: {step.error}" if step.error else ""
+        out.append(f"{heading} Step {i}: {step_type}")
+        out.append(f"- **{step_type}**: {step.description}{duration_str}{error_str}")
+        
+        if step.input_data:
+            out.append("\n**Input Data:**")
+            _INPUT_WRITERS.get(step_type, _write_generic_input)(out, step.input_data)
+        
+        if step.output_data:
+            out.append("\n**Output Data:**")
+            _OUTPUT_WRITERS.get(step_type, _write_generic_output)(out, step.output_data)
+        
+        out.append("")
+    
+    return total_duration
 
 
-def _generate_mention_section(mention_log: MentionCodingLog) -> str:
-    """Generate markdown section for a mention's coding process."""
+def _write_mention_section(out: list, mention_log: MentionCodingLog) -> None:
+    """Write the markdown section for a mention's coding process."""
     mention = mention_log.mention
     steps = mention_log.steps
     final_result = mention_log.final_result
     
-    # Calculate total duration for this mention
-    total_duration = sum(step.duration_ms for step in steps if step.duration_ms)
-    duration_str = f" ({_format_duration(total_duration)})" if total_duration > 0 else ""
-    
-    sections = [f"### Coding: '{mention}'{duration_str}", ""]
+    # The heading carries the mention's total duration, which is only known once the
+    # steps below have been written, so it is filled in last
+    heading_index = len(out)
+    out.append(None)
+    out.append("")
     
     if final_result:
-        concept_name = final_result.get('concept_name', 'Unknown')
-        concept_id = final_result.get('concept_id', 'Unknown')
-        domain = final_result.get('domain_id', 'Unknown')
-        standard = final_result.get('standard', False)
-        negated = final_result.get('negated', False)
-        
-        standard_str = " [STANDARD]" if standard else " [NON-STANDARD]"
-        negated_str = " (negated)" if negated else ""
-        sections.append(f"**Final Result**: {concept_name} (ID: {concept_id}, Domain: {domain}){standard_str}{negated_str}")
-        sections.append("")
+        get = final_result.get
+        markers = _RESULT_MARKERS[bool(get('standard', False)), bool(get('negated', False))]
+        out.append(f"**Final Result**: {get('concept_name', 'Unknown')} (ID: {get('concept_id', 'Unknown')}, Domain: {get('domain_id', 'Unknown')}){markers}")
+        out.append("")
     
     if steps:
-        sections.append("**Processing Steps:**")
-        sections.append("")
-        for i, step in enumerate(steps, 1):
-            sections.append(f"#### Step {i}: {step.step_type}")
-            sections.append(_generate_step_summary(step))
-            
-            # Add detailed step information
-            detailed_info = _generate_detailed_step_info(step)
-            if detailed_info:
-                sections.append(detailed_info)
-            sections.append("")
+        out.append("**Processing Steps:**")
+        out.append("")
+        total_duration = _write_steps(out, steps, "####")
+    else:
+        total_duration = 0
     
-    return "\n".join(sections)
+    duration_str = f" ({_format_duration(total_duration)})" if total_duration > 0 else ""
+    out[heading_index] = f"### Coding: '{mention}'{duration_str}"
 
 
 def generate_markdown_report(log: ExtractionProcessLog) -> str:
     """Generate a comprehensive markdown report from an extraction log."""
+    return "\n".join(_report_lines(log))
+
+
+def write_markdown_report(log: ExtractionProcessLog, fileobj: TextIO) -> None:
+    """Write the markdown report for an extraction log to a text file object.
+
+    Lines are written one at a time, so the full report string is never built.
+    """
+    lines = iter(_report_lines(log))
+    fileobj.write(next(lines, ""))
+    for line in lines:
+        fileobj.write("\n")
+        fileobj.write(line)
+
+
+def _report_lines(log: ExtractionProcessLog) -> list:
+    """The report's lines, in order. Every section writes into this one list."""
     
     # Header and summary
     total_duration = log.get_total_duration_ms()
     duration_str = f" ({_format_duration(total_duration)})" if total_duration else ""
     
     report = [
-        f"# Extraction Process Report{duration_str}",
-        f"**Process ID**: `{log.process_id}`",
-        f"**Start Time**: {log.start_time.strftime('%Y-%m-%d %H:%M:%S')}",
-        f"**End Time**: {log.end_time.strftime('%Y-%m-%d %H:%M:%S') if log.end_time else 'In Progress'}",
-        f"**Text Length**: {len(log.input_text)} characters",
-        ""
+        _HEADER_TEMPLATE.format(
+            duration=duration_str,
+            process_id=log.process_id,
+            # Log times are naive, so this prints the same as strftime('%Y-%m-%d %H:%M:%S')
+            start_time=log.start_time.isoformat(' ', 'seconds'),
+            end_time=log.end_time.isoformat(' ', 'seconds') if log.end_time else 'In Progress',
+            text_length=len(log.input_text)
+        )
     ]
     
     # Input text first
-    report.extend([
-        "## Input Text",
-        ""
-    ])
+    report.append(_INPUT_TEXT_HEADER)
     
     if len(log.input_text) > 2000:
         truncated_text = log.input_text[:2000] + "..."
@@ -272,109 +360,68 @@ def generate_markdown_report(log: ExtractionProcessLog) -> str:
     # Get usage statistics
     usage_stats = log.get_usage_statistics()
     
-    report.extend([
-        "## Process Summary",
-        f"- **Mentions identified**: {num_mentions}",
-        f"- **Concepts coded**: {num_final_results}",
-        f"- **Standard concepts found**: {num_standard}",
-        f"- **Negated concepts**: {num_negated}",
-        f"- **Total processing time**: {_format_duration(total_duration)}" if total_duration else "- **Total processing time**: Unknown",
-        ""
-    ])
+    report.append(_SUMMARY_TEMPLATE.format(
+        num_mentions=num_mentions,
+        num_results=num_final_results,
+        num_standard=num_standard,
+        num_negated=num_negated,
+        total_time=_format_duration(total_duration) if total_duration else "Unknown"
+    ))
     
     # Add usage statistics section
     if usage_stats['total_requests'] > 0:
-        from models.model_config import format_cost
-        
-        report.extend([
-            "## Token Usage & Cost Statistics",
-            f"- **Total API Requests**: {usage_stats['total_requests']}",
-            f"- **Request Tokens**: {usage_stats['total_request_tokens']:,}",
-            f"- **Response Tokens**: {usage_stats['total_response_tokens']:,}",
-            f"- **Total Tokens**: {usage_stats['total_tokens']:,}",
-            f"- **Total Cost**: {format_cost(usage_stats['total_cost'])}",
-            f"- **Average Tokens per Request**: {usage_stats['avg_tokens_per_request']:.1f}",
-            f"- **Average Cost per Request**: {format_cost(usage_stats['avg_cost_per_request'])}",
-            ""
-        ])
+        report.append(_USAGE_TEMPLATE.format(
+            total_requests=usage_stats['total_requests'],
+            total_request_tokens=usage_stats['total_request_tokens'],
+            total_response_tokens=usage_stats['total_response_tokens'],
+            total_tokens=usage_stats['total_tokens'],
+            total_cost=format_cost(usage_stats['total_cost']),
+            avg_tokens_per_request=usage_stats['avg_tokens_per_request'],
+            avg_cost_per_request=format_cost(usage_stats['avg_cost_per_request'])
+        ))
         
         # Show models used
         if usage_stats['models_used']:
-            models_list = ', '.join(usage_stats['models_used'])
-            report.extend([
-                f"- **Models Used**: {models_list}",
-                ""
-            ])
+            report.append(_MODELS_USED_TEMPLATE.format(models=', '.join(usage_stats['models_used'])))
         
         # Add detailed breakdown if any non-zero values exist
         details = usage_stats['details']
         if any(details.values()):
-            report.extend([
-                "### Detailed Token Breakdown",
-                f"- **Cached Tokens**: {details['cached_tokens']:,}",
-                f"- **Reasoning Tokens**: {details['reasoning_tokens']:,}",
-                f"- **Accepted Prediction Tokens**: {details['accepted_prediction_tokens']:,}",
-                f"- **Rejected Prediction Tokens**: {details['rejected_prediction_tokens']:,}",
-                f"- **Audio Tokens**: {details['audio_tokens']:,}",
-                ""
-            ])
+            report.append(_TOKEN_BREAKDOWN_TEMPLATE.format(**details))
     
     # Top-level process steps with details
     if log.steps:
-        report.extend([
-            "## Process Overview",
-            ""
-        ])
-        for i, step in enumerate(log.steps, 1):
-            report.append(f"### Step {i}: {step.step_type}")
-            report.append(_generate_step_summary(step))
-            detailed_info = _generate_detailed_step_info(step)
-            if detailed_info:
-                report.append(detailed_info)
-            report.append("")
+        report.append(_PROCESS_OVERVIEW_HEADER)
+        _write_steps(report, log.steps, "###")
     
     # Individual mention coding with full details
     if log.mention_logs:
-        report.extend([
-            "## Detailed Mention Coding Process",
-            ""
-        ])
+        report.append(_MENTION_CODING_HEADER)
         
         for mention_log in log.mention_logs:
-            report.append(_generate_mention_section(mention_log))
+            _write_mention_section(report, mention_log)
             report.append("")
     
     # Final results summary with complete information
     if log.final_results:
-        report.extend([
-            "## Final Results Summary",
-            ""
-        ])
+        report.append(_FINAL_RESULTS_HEADER)
         
+        # One formatted entry per result, blank separator line included
         for i, result in enumerate(log.final_results, 1):
-            mention = result.get('mention_str', 'Unknown')
-            concept_name = result.get('concept_name', 'Unknown')
-            concept_id = result.get('concept_id', 'Unknown')
-            domain = result.get('domain_id', 'Unknown')
-            vocabulary = result.get('vocabulary_id', 'Unknown')
-            concept_code = result.get('concept_code', 'Unknown')
-            negated = result.get('negated', False)
-            standard = result.get('standard', False)
-            
-            negated_str = " (negated)" if negated else ""
-            standard_str = " [STANDARD]" if standard else " [NON-STANDARD]"
-            
-            report.append(f"{i}. **'{mention}'** → {concept_name}")
-            report.append(f"   - **Concept ID**: {concept_id}")
-            report.append(f"   - **Domain**: {domain}")
-            report.append(f"   - **Vocabulary**: {vocabulary}")
-            report.append(f"   - **Concept Code**: {concept_code}")
-            report.append(f"   - **Standard Status**: {standard_str.strip()}")
-            if negated:
-                report.append(f"   - **Negated**: Yes")
-            report.append("")
-    
-    return "\n".join(report)
+            get = result.get
+            report.append(_FINAL_RESULT_TEMPLATE.format(
+                index=i,
+                mention=get('mention_str', 'Unknown'),
+                concept_name=get('concept_name', 'Unknown'),
+                concept_id=get('concept_id', 'Unknown'),
+                domain=get('domain_id', 'Unknown'),
+                vocabulary=get('vocabulary_id', 'Unknown'),
+                concept_code=get('concept_code', 'Unknown'),
+                standard_status="[STANDARD]" if get('standard', False) else "[NON-STANDARD]",
+                negated=_NEGATED_LINE if get('negated', False) else ""
+            ))
+    
+    return report
 
 
 def generate_summary_stats(log: ExtractionProcessLog) -> Dict[str, Any]:
@@ -384,10 +431,9 @@ def generate_summary_stats(log: ExtractionProcessLog) -> Dict[str, Any]:
     num_results = len(log.final_results)
     
     # Count different types of steps
-    step_counts = {}
-    for mention_log in log.mention_logs:
-        for step in mention_log.steps:
-            step_counts[step.step_type] = step_counts.get(step.step_type, 0) + 1
+    step_counts = Counter(
+        step.step_type for mention_log in log.mention_logs for step in mention_log.steps
+    )
     
     # Average time per mention
     avg_time_per_mention = None
@@ -400,6 +446,6 @@ def generate_summary_stats(log: ExtractionProcessLog) -> Dict[str, Any]:
         "num_concepts_coded": num_results,
         "success_rate": (num_results / num_mentions * 100) if num_mentions > 0 else 0,
         "avg_time_per_mention_ms": avg_time_per_mention,
-        "step_type_counts": step_counts,
+        "step_type_counts": dict(step_counts),
         "text_length": len(log.input_text)
     }